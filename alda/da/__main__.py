@@ -338,6 +338,27 @@ def parseArgs():
         help="Enable Constraint Solving",
         action='store_true',
     )
+    parser.add_argument(
+        '--xsb-server',
+        default=False,
+        help="Keep one xsb process per rule set across calls to infer",
+        action='store_true',
+    )
+    parser.add_argument(
+        '--infer-cache',
+        type=int,
+        default=0,
+        metavar='ENTRIES',
+        help="Memoize the results of up to ENTRIES calls to infer, "
+        "keyed by the rule set, bindings, and queries. 0 disables the cache.",
+    )
+    parser.add_argument(
+        '--infer-cache-bytes',
+        type=int,
+        default=64 * 2**20,
+        metavar='BYTES',
+        help="Bound the estimated size of the results memoized by --infer-cache.",
+    )
     parser.add_argument(
         '--timing',
         default=False,
@@ -0,0 +1,130 @@
+import atexit
+import subprocess
+
+from .interning import InternTable, ProgressReporter
+
+
+class XSBEngine:
+    """
+    A long-lived xsb process for one rule set, driven over pipes by xsbserver.P.
+    The rule file is consulted once, then each query replaces the facts
+    and streams the answers back.
+    """
+
+    engines = dict()  # rule base -> XSBEngine
+
+    @classmethod
+    def get(cls, rule_base, lib_dir):
+        """return the running engine of rule_base, starting one if needed"""
+        engine = cls.engines.get(rule_base)
+        if engine is None or engine.proc.poll() is not None:
+            engine = cls(rule_base, lib_dir)
+            cls.engines[rule_base] = engine
+        return engine
+
+    @classmethod
+    def close_all(cls):
+        for engine in cls.engines.values():
+            engine.close()
+        cls.engines.clear()
+
+    def __init__(self, rule_base, lib_dir):
+        self.rule_base = rule_base
+        # facts of each base predicate and interned values as of the last update,
+        # kept for incremental inference
+        self.facts = dict()
+        self.interned = InternTable(progress=ProgressReporter('encoding'))
+        self.proc = subprocess.Popen(
+            [
+                'xsb',
+                '--nobanner',
+                '--quietload',
+                '--noprompt',
+                '-e',
+                "add_lib_dir(a('{}')).".format(lib_dir),
+                '-e',
+                "xsbserver:xsb_server('{}').".format(rule_base),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self.read_until('%ready')
+
+    def read_until(self, marker):
+        """return the lines written by xsb before the line marker"""
+        lines = []
+        for line in self.proc.stdout:
+            line = line.rstrip('\n')
+            if line == marker:
+                return lines
+            lines.append(line)
+        raise RuntimeError('xsb engine for %s exited' % self.rule_base)
+
+    def query(self, fact_base, preds, queries):
+        """
+        Replace the facts of preds, a list of (predicate, arity), by those of fact_base,
+        and run queries, a list of query strings.
+        Return the answers of each query, in the format of extfilequery's answer files,
+        and the xsb load and query times, elapsed and cpu.
+        """
+        self.send(
+            "query('%s',[%s],[%s]).\n"
+            % (
+                fact_base,
+                ','.join('%s/%s' % pa for pa in preds),
+                ','.join(queries),
+            )
+        )
+        return self.answers()
+
+    def update(self, retracts, asserts, queries):
+        """
+        Retract and assert facts, given as lists of fact strings,
+        updating the incremental tables, and run queries. Return the same as query.
+        """
+        self.send(
+            'update([%s],[%s],[%s]).\n'
+            % (','.join(retracts), ','.join(asserts), ','.join(queries))
+        )
+        return self.answers()
+
+    def send(self, command):
+        self.proc.stdin.write(command)
+        self.proc.stdin.flush()
+
+    def answers(self):
+        """read the answers of each query and the times, up to the line %done"""
+        lines = self.read_until('%done')
+        if not lines or not lines[-1].startswith('%times '):
+            raise RuntimeError(
+                'xsb engine for %s failed: %s' % (self.rule_base, '\n'.join(lines))
+            )
+        answers = []
+        answer = []
+        for line in lines[:-1]:
+            if line == '%end':
+                answers.append(''.join(answer))
+                answer = []
+            else:
+                answer.append(line + '\n')
+        return answers, lines[-1][len('%times ') :].split(',')
+
+    def discard(self):
+        """stop the engine and forget it, so that the next get starts a new one"""
+        if XSBEngine.engines.get(self.rule_base) is self:
+            del XSBEngine.engines[self.rule_base]
+        self.close()
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.write('stop.\n')
+                self.proc.stdin.close()
+            except OSError:  # xsb no longer reads its input
+                self.proc.kill()
+            self.proc.wait()
+
+
+atexit.register(XSBEngine.close_all)
@@ -4,24 +4,30 @@
 import sys
 import uuid
 from ast import literal_eval
+from itertools import chain, islice
 from pathlib import PurePath
 from pprint import pformat, pprint
 
 from .. import common
-from .rule_io import read_answer, rule_path, write_file
+from .engine import XSBEngine
+from .interning import InternTable, ProgressReporter
+from .memo import InferCache
+from .rule_io import open_file, read_answer, rule_path
 
 UniqueLowerCasePrefix = 'p'
 xsb_path = PurePath.joinpath(PurePath(__file__).parent, 'xsb')
+FactChunkSize = 10000  # number of facts formatted and written at a time
 if os.name == 'nt':
     xsb_path = str(xsb_path).replace('\\', '\\\\')
 
 
 class InferXSB:
-    def __init__(self, rules, arity, bindings, queries):
+    def __init__(self, rules, arity, bindings, queries, incremental=False):
         self.rules = rules
         self.arity = arity
         self.bindings = bindings
         self.queries = queries
+        self.incremental = incremental  # whether to update the facts of the last call
         self.encoded = True  # whether the input is encoded as internal representation
         for (
             _,
@@ -32,9 +38,7 @@ def __init__(self, rules, arity, bindings, queries):
             if not self.facts_encoded(val):
                 self.encoded = False
                 break
-        self.ValueDict = dict()
-        self.ValueIdDict = dict()
-        self.generator = self.gensym()
+        self.interned = InternTable(progress=ProgressReporter('encoding'))
 
     def facts_encoded(self, val):
         """whether facts are encoded as internal presentation"""
@@ -52,7 +56,7 @@ def gen_unique_id(self):
 
     def eval_logicVar(self, v):
         if not self.encoded and isinstance(v, int):
-            v = self.ValueDict[v]
+            v = self.interned.value(v)
         return (
             eval(v)
             if v.isdigit()
@@ -69,25 +73,8 @@ def flatten(self, x):
         else:
             return [x]
 
-    def gensym(self):
-        i = 0
-        while True:
-            i += 1
-            yield int(i)
-
     def getid(self, node):
-        buf = pformat(node)
-        buf = buf.replace('\n', ' ')
-        print(
-            '>>> encoding ', buf[:50], end='\r'
-        )  # TODO comment out to improve performance
-        if node not in self.ValueIdDict:
-            genid = next(self.generator)
-            self.ValueIdDict[node] = genid
-            self.ValueDict[genid] = node
-            return genid
-        else:
-            return self.ValueIdDict[node]
+        return self.interned.intern(node)
 
     def LogicVarToXSB(self, v):
         if self.encoded:
@@ -146,28 +133,70 @@ def time_dur(self, t1, t2, name):  # os.times t1 and t2, string name
         u2, s2, cu2, cs2, elapsed2 = t2
         print(f'{name}\t{elapsed2-elapsed1}\t{u2-u1 + s2-s1 + cu2-cu1 + cs2-cs1}')
 
+    def int_facts(self, chunk, arity):
+        """whether each fact in chunk is a plain int or a flat tuple of arity ints"""
+        if arity == 1:
+            return all(type(v) is int for v in chunk)
+        return all(
+            type(v) is tuple and len(v) == arity and all(type(x) is int for x in v)
+            for v in chunk
+        )
+
+    def fact_chunks(self, pred, val):
+        """generate the facts of one binding as strings of up to FactChunkSize facts"""
+        if len(val) == 0:  # val is an empty predicate
+            # generate a place holder where all logic vars are -1
+            yield self.gen_fact(pred, ['-1'] * self.arity[pred]) + '.\n'
+        elif not isinstance(val, list) and not isinstance(
+            val, set
+        ):  # val is a single value
+            yield self.gen_fact(pred, val) + '.\n'
+        else:  # val is a set or list
+            arity = self.arity[pred]
+            template = (
+                UniqueLowerCasePrefix + pred + '(%s).\n' % ','.join(['%d'] * arity)
+            )
+            values = iter(val)
+            chunk = list(islice(values, FactChunkSize))
+            while chunk:
+                # flat int facts are formatted in one go, printing as in LogicVarToXSB
+                if self.encoded and self.int_facts(chunk, arity):
+                    args = tuple(chunk if arity == 1 else chain.from_iterable(chunk))
+                    yield (template * len(chunk)) % args
+                else:
+                    yield ''.join([self.gen_fact(pred, v) + '.\n' for v in chunk])
+                chunk = list(islice(values, FactChunkSize))
+
+    def write_facts(self, filename):
+        """stream the facts of all bindings to filename, returning its size in bytes"""
+        with open_file(filename) as f:
+            for key, val in self.bindings:  # pair of predicate name and tuple values
+                for chunk in self.fact_chunks(key, val):
+                    f.write(chunk)
+            return f.tell()
+
     def xsb_file_interface(self):
         t_start = os.times()
 
-        # generate facts
-        xsb_facts = ""
         rule_filename = self.rules + '_' + self.gen_unique_id()
-        for key, val in self.bindings:  # pair of predicate name and tuple values
-            if len(val) == 0:  # val is an empty predicate
-                # generate a place holder where all logic vars are -1
-                xsb_facts += self.gen_fact(key, ['-1'] * self.arity[key]) + '.\n'
-            elif not isinstance(val, list) and not isinstance(
-                val, set
-            ):  # val is a single value
-                xsb_facts += self.gen_fact(key, val) + '.\n'
-            else:  # val is a set or list
-                for v in val:
-                    xsb_facts += self.gen_fact(key, v) + '.\n'
+        rule_path_rule = PurePath.joinpath(rule_path, self.rules)
+        rule_path_fact = PurePath.joinpath(rule_path, rule_filename)
+        if os.name == 'nt':
+            rule_path_rule = str(rule_path_rule).replace('\\', '\\\\')
+            rule_path_fact = str(rule_path_fact).replace('\\', '\\\\')
 
-        write_file(rule_filename + '.facts', xsb_facts)
-        # print('\tnum_fact\tfile_size')
-        # print('datasize\t%s\t%s' % (len(xsb_facts.split('\n')),
-        #     os.path.getsize(PurePath.joinpath(rule_path,rule_filename+'.facts'))))
+        if self.incremental:
+            # the engine of the incremental rules keeps the facts and interned values
+            # of the last call, so only the differences are sent
+            engine = self.start_engine(str(rule_path_rule) + '.incr')
+            if engine is None:
+                return self.no_results()
+            self.interned = engine.interned
+            delta = self.fact_delta(engine.facts)
+            facts_size = sum(len(f) + 1 for facts in delta[:2] for f in facts)
+        else:
+            # generate and write facts
+            facts_size = self.write_facts(rule_filename + '.facts')
 
         t_facts = os.times()  # after prep and write facts
 
@@ -198,64 +227,32 @@ def xsb_file_interface(self):
                     ]
                 )
 
-        print('', flush=True)  # clear the print(end='\r') after effect
-
-        rule_path_rule = PurePath.joinpath(rule_path, self.rules)
-        rule_path_fact = PurePath.joinpath(rule_path, rule_filename)
-        if os.name == 'nt':
-            rule_path_rule = str(rule_path_rule).replace('\\', '\\\\')
-            rule_path_fact = str(rule_path_fact).replace('\\', '\\\\')
+        self.interned.progress.done()
 
-        xsb_query = "extfilequery:external_file_query('{}','{}',{}).".format(
-            rule_path_rule,
-            rule_path_fact,
-            "[%s]" % ",".join("['%s',%s]" % (qfile, qstr) for qfile, qstr in _queries),
-        )
-        # print(xsb_query)
-
-        # check if xsb command can be run
-        status, output = subprocess.getstatusoutput('xsb -h')
-        if status != 0:
-            if 'xsb: command not found' in output:
-                print('** ERROR! Rule Engine Not Found. Check Your Installation. **')
-            else:
-                print('** ERROR! %s **' % output)
-            if len(_queries) == 1:
-                return []
-            else:
-                return (None,) * len(_queries)
-
-        t_pre = os.times()  # before run xsb
-
-        # output = subprocess.run(["xsb",
-        output = subprocess.run(
-            [
-                'xsb',
-                '--nobanner',
-                '--quietload',
-                '--noprompt',
-                '-e',
-                "add_lib_dir(a('{}')).".format(xsb_path),
-                '-e',
-                xsb_query,
-            ],
-            stdout=subprocess.PIPE,
-            text=True,
-        )
+        xsb_server = common.get_runtime_option('xsb_server', default=False)
+        if self.incremental:
+            t_pre = os.times()  # before run xsb
+            answers, stdout = self.run_xsb_incremental(engine, delta, _queries)
+        elif xsb_server or self.xsb_available():
+            t_pre = os.times()  # before run xsb
+            run = self.run_xsb_engine if xsb_server else self.run_xsb_process
+            answers, stdout = run(rule_path_rule, rule_path_fact, _queries)
+        else:
+            answers = None
+        if answers is None:  # xsb could not be run
+            return self.no_results()
 
         t_post = os.times()  # after run xsb
 
         results = []
-        for r, _ in _queries:
-            rname = PurePath(r).name
-            answers = read_answer(rname)
+        for answer in answers:
             tuples = {
                 (
                     tuple(self.eval_logicVar(v) for v in a.split(','))
                     if len(a.split(',')) > 1
                     else self.eval_logicVar(a)
                 )
-                for a in answers.split("\n")[:-1]
+                for a in answer.split("\n")[:-1]
             }
             results.append(tuples)
 
@@ -263,7 +260,7 @@ def xsb_file_interface(self):
             t_res = os.times()  # after reading results
 
             # times for reading data and querying in xsb
-            lines = output.stdout.split('\n')
+            lines = stdout.split('\n')
             lines = [l for l in lines if (l and l != 'yes' and l != 'no')]
             print('timing\telapse\tcpu')
             print('xsb_load\t%s\t%s' % (lines[-4], lines[-3]))
@@ -278,12 +275,141 @@ def xsb_file_interface(self):
             self.time_dur(t_post, t_res, 'read_results')
             self.time_dur(t_post, t_end, 'postproc_xsb')
 
+            # throughput of writing the facts file
+            write_elapsed = t_facts[4] - t_start[4]
+            print('throughput\tbytes\tbytes_per_sec')
+            print(
+                'write_facts\t%s\t%s'
+                % (facts_size, facts_size / write_elapsed if write_elapsed > 0 else '')
+            )
+
+            if not self.encoded:
+                stats = self.interned.stats()
+                print('interning\thits\tmisses\tsize\tbytes')
+                print('intern_table\t%(hits)s\t%(misses)s\t%(size)s\t%(bytes)s' % stats)
+
         if len(results) == 0:
             return results
         if len(results) == 1:  # there is only one query
             return results[0]
         return tuple(results)
 
+    def no_results(self):
+        """the result of infer when xsb cannot be run"""
+        if len(self.queries) == 1:
+            return []
+        else:
+            return (None,) * len(self.queries)
+
+    def fact_delta(self, facts):
+        """
+        compare the bindings with facts, a dict from predicate to the set of its values.
+        return the facts to retract, the facts to assert, and the new values of each
+        predicate
+        """
+        retracts = []
+        asserts = []
+        current = dict()
+        for key, val in self.bindings:  # pair of predicate name and tuple values
+            if len(val) == 0:  # val is an empty predicate, declared dynamic
+                values = set()
+            elif not isinstance(val, list) and not isinstance(
+                val, set
+            ):  # val is a single value
+                values = {val}
+            else:  # val is a set or list
+                values = set(val)
+            previous = facts.get(key, set())
+            retracts.extend(self.gen_fact(key, v) for v in previous - values)
+            asserts.extend(self.gen_fact(key, v) for v in values - previous)
+            current[key] = values
+        return retracts, asserts, current
+
+    def xsb_available(self):
+        """check if xsb command can be run"""
+        status, output = subprocess.getstatusoutput('xsb -h')
+        if status != 0:
+            if 'xsb: command not found' in output:
+                print('** ERROR! Rule Engine Not Found. Check Your Installation. **')
+            else:
+                print('** ERROR! %s **' % output)
+            return False
+        return True
+
+    def run_xsb_process(self, rule_path_rule, rule_path_fact, _queries):
+        """
+        run the queries in a new xsb process that consults rules and loads facts.
+        return the answers of each query, read when iterated, and the output of xsb
+        """
+        xsb_query = "extfilequery:external_file_query('{}','{}',{}).".format(
+            rule_path_rule,
+            rule_path_fact,
+            "[%s]" % ",".join("['%s',%s]" % (qfile, qstr) for qfile, qstr in _queries),
+        )
+        # print(xsb_query)
+
+        # output = subprocess.run(["xsb",
+        output = subprocess.run(
+            [
+                'xsb',
+                '--nobanner',
+                '--quietload',
+                '--noprompt',
+                '-e',
+                "add_lib_dir(a('{}')).".format(xsb_path),
+                '-e',
+                xsb_query,
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        answers = (read_answer(PurePath(r).name) for r, _ in _queries)
+        return answers, output.stdout
+
+    def start_engine(self, rule_base):
+        """return the persistent xsb engine of rule_base, or None if it cannot start"""
+        try:
+            return XSBEngine.get(rule_base, xsb_path)
+        except OSError as e:
+            print('** ERROR! Rule Engine Not Found. Check Your Installation. %s **' % e)
+            return None
+
+    def run_xsb_engine(self, rule_path_rule, rule_path_fact, _queries):
+        """
+        run the queries in the persistent xsb engine of the rules, replacing its facts.
+        return the answers of each query and the xsb times formatted as xsb output,
+        or (None, None) if the engine cannot be started
+        """
+        engine = self.start_engine(str(rule_path_rule))
+        if engine is None:
+            return None, None
+        preds = [
+            (UniqueLowerCasePrefix + key, self.arity[key]) for key, _ in self.bindings
+        ]
+        answers, times = engine.query(
+            str(rule_path_fact), preds, [qstr for _, qstr in _queries]
+        )
+        return answers, '\n'.join(times)
+
+    def run_xsb_incremental(self, engine, delta, _queries):
+        """
+        send delta, as returned by fact_delta, to the engine of the incremental rules,
+        whose tables are updated, and run the queries. return the same as run_xsb_engine
+        """
+        retracts, asserts, facts = delta
+        try:
+            answers, times = engine.update(
+                retracts, asserts, [qstr for _, qstr in _queries]
+            )
+        except RuntimeError as e:
+            # part of the delta may have been applied, so the facts of the engine
+            # are unknown: the next call starts a new engine from no facts
+            print('** ERROR! %s **' % e)
+            engine.discard()
+            return None, None
+        engine.facts.update(facts)
+        return answers, '\n'.join(times)
+
     def xsb_px_interface(self):
         px = importlib.import_module("px")
         # TODO
@@ -295,9 +421,24 @@ def xsb_px_interface(self):
         #   so additional rule for rewriting the query to and from this form might be needed
 
 
-def _infer(rules, arity, bindings, queries):
-    infer_xsb = InferXSB(rules, arity, bindings, queries)
-    return infer_xsb.xsb_file_interface()
+def _infer(rules, arity, bindings, queries, incremental=False):
+    cache = None if incremental else InferCache.get()
+    key = cache.key(rules, bindings, queries) if cache is not None else None
+    result = cache.lookup(key) if key is not None else None
+    if result is None:
+        infer_xsb = InferXSB(rules, arity, bindings, queries, incremental)
+        result = infer_xsb.xsb_file_interface()
+        # results of failed calls to xsb, [] or a tuple with None, are not cached
+        if key is not None and (
+            isinstance(result, set)
+            or (isinstance(result, tuple) and None not in result)
+        ):
+            cache.store(key, result)
+    if cache is not None and common.get_runtime_option('timing', default=False):
+        stats = cache.stats()
+        print('memoization\thits\tmisses\tentries\tbytes')
+        print('infer_cache\t%(hits)s\t%(misses)s\t%(entries)s\t%(bytes)s' % stats)
+    return result
     # TODO uncomment after finish writing xsb_px_interface
     # if importlib.util.find_spec("px"):
     #     return infer_xsb.xsb_px_interface()
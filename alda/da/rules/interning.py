@@ -0,0 +1,77 @@
+import sys
+import time
+from pprint import pformat
+
+
+class ProgressReporter:
+    """prints a progress line at most once every interval seconds"""
+
+    def __init__(self, label, interval=1.0, check_every=1024):
+        self.label = label
+        self.interval = interval
+        self.check_every = check_every  # counts between two reads of the clock
+        self.last = time.perf_counter()
+        self.reported = False
+
+    def update(self, count, item=None):
+        if count % self.check_every != 0:
+            return
+        now = time.perf_counter()
+        if now - self.last < self.interval:
+            return
+        self.last = now
+        self.reported = True
+        preview = '' if item is None else pformat(item).replace('\n', ' ')[:50]
+        print('>>> %s %s %s' % (self.label, count, preview), end='\r', flush=True)
+
+    def done(self):
+        """clear the print(end='\\r') after effect, if anything was printed"""
+        if self.reported:
+            print('', flush=True)
+            self.reported = False
+
+
+class InternTable:
+    """
+    Maps hashable values to consecutive integer ids, starting from 1, and back.
+    The forward table is a dict from value to id, the reverse one a list indexed by id.
+    """
+
+    def __init__(self, progress=None):
+        self.ids = dict()
+        self.values = [None]  # id 0 is never given out
+        self.hits = 0
+        self.misses = 0
+        self.progress = progress
+
+    def __len__(self):
+        return len(self.values) - 1
+
+    def __contains__(self, value):
+        return value in self.ids
+
+    def intern(self, value):
+        """return the id of value, giving it the next id if it was not interned yet"""
+        id = self.ids.get(value)
+        if id is not None:
+            self.hits += 1
+            return id
+        self.misses += 1
+        id = len(self.values)
+        self.ids[value] = id
+        self.values.append(value)
+        if self.progress is not None:
+            self.progress.update(id, value)
+        return id
+
+    def value(self, id):
+        return self.values[id]
+
+    def stats(self):
+        """hit and miss counts, number of values, and size in bytes of the two tables"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self),
+            'bytes': sys.getsizeof(self.ids) + sys.getsizeof(self.values),
+        }
@@ -0,0 +1,105 @@
+import sys
+
+from .. import common
+
+
+class InferCache:
+    """
+    Memoizes the results of infer, keyed by the rule set, the values of the bindings,
+    and the queries. Least recently used results are evicted to keep at most
+    max_entries results and max_bytes bytes.
+    """
+
+    cache = None  # the cache configured by the runtime options, created on first use
+
+    @classmethod
+    def get(cls):
+        """return the cache if enabled by the runtime option infer_cache, else None"""
+        max_entries = common.get_runtime_option('infer_cache', default=0)
+        if not max_entries:
+            return None
+        if cls.cache is None:
+            max_bytes = common.get_runtime_option('infer_cache_bytes', default=64 << 20)
+            cls.cache = cls(max_entries, max_bytes)
+        return cls.cache
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lru = common.LRU(max_entries)
+        self.sizes = dict()  # key -> estimated size in bytes of key and result
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, rules, bindings, queries):
+        """
+        return the cache key of a call to infer, with the values of each binding
+        as a frozenset, or None if some value is not hashable
+        """
+        try:
+            return (
+                rules,
+                tuple(
+                    (
+                        pred,
+                        (
+                            frozenset(val)
+                            if isinstance(val, (list, set, frozenset))
+                            else val
+                        ),
+                    )
+                    for pred, val in bindings
+                ),
+                tuple(queries),
+            )
+        except TypeError:
+            return None
+
+    def lookup(self, key):
+        """return a copy of the cached result of key, or None"""
+        if key in self.lru:
+            self.hits += 1
+            return self.copy(self.lru[key])
+        self.misses += 1
+        return None
+
+    def store(self, key, result):
+        """cache a copy of result, a set or a tuple of sets, evicting old results"""
+        size = self.size(key, result)
+        if size > self.max_bytes:
+            return
+        while self.lru.first is not None and (
+            len(self.lru.d) >= self.max_entries or self.bytes + size > self.max_bytes
+        ):
+            self.evict(self.lru.first.me[0])
+        self.lru[key] = self.copy(result)
+        self.sizes[key] = size
+        self.bytes += size
+
+    def evict(self, key):
+        del self.lru[key]
+        self.bytes -= self.sizes.pop(key)
+
+    @staticmethod
+    def copy(result):
+        if isinstance(result, tuple):
+            return tuple(set(r) for r in result)
+        return set(result)
+
+    @staticmethod
+    def size(key, result):
+        """estimated size in bytes of the containers in key and the tuples of result"""
+        sets = list(result) if isinstance(result, tuple) else [result]
+        return (
+            sum(sys.getsizeof(val) for _, val in key[1])
+            + sum(sys.getsizeof(s) + sum(sys.getsizeof(t) for t in s) for s in sets)
+        )
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self.lru.d),
+            'bytes': self.bytes,
+        }
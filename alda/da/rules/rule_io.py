@@ -12,6 +12,10 @@ def write_file(filename, string):
     file.close()
 
 
+def open_file(filename, buffering=1 << 20):
+    return open(PurePath.joinpath(rule_path, filename), 'w', buffering=buffering)
+
+
 def read_answer(filename):
     return open(PurePath.joinpath(rule_path, "{}.answers".format(filename)), "r").read()
 
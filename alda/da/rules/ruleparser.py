@@ -121,7 +121,7 @@ def gen_name(self, node, rule_set=None):
                 scope = scope.parent
             return self.create_expr(dast.NameExpr, value=node)
 
-    def gen_assignInfer(self, rule_set, user_binding=None):
+    def gen_assignInfer(self, rule_set, user_binding=None, incremental=None):
         """assign the return value of infer to all bounded derived variables
         the case when queries are not specified
         """
@@ -143,14 +143,17 @@ def gen_assignInfer(self, rule_set, user_binding=None):
                     dast.TupleExpr, subexprs=[self.gen_name(v) for v in derived]
                 )
             ]
-        stmt.value = self.gen_infer_call(rule_set, user_binding, queries)
+        stmt.value = self.gen_infer_call(rule_set, user_binding, queries, incremental)
         for v in rule_set.bounded_derived:
             v.add_assignment(stmt)
         return stmt
 
-    def gen_infer_call(self, rule_set, user_binding=None, user_query=None):
+    def gen_infer_call(
+        self, rule_set, user_binding=None, user_query=None, incremental=None
+    ):
         """generate infer call of rule_set with user_binding and user_query
         an addition arity argument is added storing the arities of all predicates used in the rule.
+        incremental, if given, is passed on to choose incremental inference.
         """
         callinf = self.create_expr(dast.CallExpr)
         func = self.create_expr(
@@ -178,6 +181,8 @@ def gen_infer_call(self, rule_set, user_binding=None, user_query=None):
         keywords.append(('arity', arity))
         keywords.append(('bindings', user_binding))
         keywords.append(('queries', user_query))
+        if incremental:
+            keywords.append(('incremental', incremental))
         # pprint(vars(callinf))
         callinf.func = func
         callinf.args = []
@@ -298,9 +303,13 @@ def gen_rule_func_def(self, ruleset):
 
         fd.args.add_defaultarg('bindings', self.create_expr(dast.NoneExpr))
         fd.args.add_defaultarg('queries', self.create_expr(dast.NoneExpr))
+        fd.args.add_defaultarg('incremental', self.create_expr(dast.FalseExpr))
 
         user_binding = self.create_expr(dast.NameExpr, value=fd.find_name('bindings'))
         user_query = self.create_expr(dast.NameExpr, value=fd.find_name('queries'))
+        incremental = self.create_expr(
+            dast.NameExpr, value=fd.find_name('incremental')
+        )
 
         # the value of user_bindiing should be a tuple or None,
         # create a If statement, that test user_binding,
@@ -381,13 +390,15 @@ def gen_rule_func_def(self, ruleset):
         ifstmt.condition = self.create_expr(dast.NameExpr, value=user_query)
 
         # if queries are specified, return the value of infer
-        inferexpr = self.gen_infer_call(ruleset, user_binding, user_query)
+        inferexpr = self.gen_infer_call(
+            ruleset, user_binding, user_query, incremental
+        )
         rtstmt = self.create_expr(dast.ReturnStmt)
         rtstmt.value = inferexpr
         ifstmt.body.append(rtstmt)
 
         # else, assign result of infer to derived variables
-        inferstmt = self.gen_assignInfer(ruleset, user_binding)
+        inferstmt = self.gen_assignInfer(ruleset, user_binding, incremental)
         if inferstmt:
             ifstmt.elsebody.append(inferstmt)
             for d in ruleset.bounded_derived:
@@ -593,6 +604,9 @@ def visit_Function(self, node):
             # write the rule to file, and add the file name to RuleSet object
             res.filename = self.moduleName + '.' + res.unique_name
             write_file(res.filename + '.rules', XSBTranslator().visit(res))
+            write_file(
+                res.filename + '.incr.rules', XSBTranslator(incremental=True).visit(res)
+            )
 
             # check if any derived variable can be automatically maintained
             # 	condition: all base predicates are bounded and some derived predicates are bounded
@@ -709,9 +723,24 @@ def visit_NoneExpr(self, node):
 
 
 class XSBTranslator(NodeVisitor):
+    def __init__(self, incremental=False):
+        super().__init__()
+        self.incremental = incremental
 
     def visit_RuleSet(self, node):
-        return ':- auto_table.\n' + '\n'.join(self.visit(rule) for rule in node.rules)
+        rules = '\n'.join(self.visit(rule) for rule in node.rules)
+        if not self.incremental:
+            return ':- auto_table.\n' + rules
+        # base predicates are updated by incr_assert and incr_retract,
+        # which update the incremental tables of derived predicates depending on them
+        decls = [
+            ':- dynamic %s/%s as incremental.' % (self.visit(p), node.get_arity(p))
+            for p in sorted(node.base, key=lambda p: p.name)
+        ] + [
+            ':- table %s/%s as incremental.' % (self.visit(p), node.get_arity(p))
+            for p in sorted(node.derived, key=lambda p: p.name)
+        ]
+        return '\n'.join(decls) + '\n' + rules
 
     def visit_Rule(self, node):
         if node.hypos == None:
@@ -869,7 +898,7 @@ def gen_infer_at_use(self, d, rs):
         self.pop_state()
         return ifstmt
 
-    def gen_rule_func_call(self, func, bindings=None, queries=None):
+    def gen_rule_func_call(self, func, bindings=None, queries=None, incremental=None):
         rulecall = self.create_expr(dast.CallExpr)
         rulecall.func = func
         keywords = []
@@ -877,6 +906,8 @@ def gen_rule_func_call(self, func, bindings=None, queries=None):
             keywords.append(('bindings', bindings))
         if queries:
             keywords.append(('queries', queries))
+        if incremental:
+            keywords.append(('incremental', incremental))
         rulecall.keywords = keywords
         rulecall.args = []
         return rulecall
@@ -981,6 +1012,7 @@ def visit_CallExpr(self, node):
             rule_name = None
             user_binding = None
             user_query = None
+            incremental = None
 
             if node.keywords:
                 for key, val in node.keywords:
@@ -1003,13 +1035,17 @@ def visit_CallExpr(self, node):
                         user_binding = val
                     elif key == 'queries':
                         user_query = val
+                    elif key == 'incremental':
+                        incremental = val
                     else:
                         self.warn(
                             'Invalid argument %s in call of infer, ignored' % key, node
                         )
             if not rule_var:
                 self.error('Infer function requires keyword argument: rules', node)
-            rulecall = self.gen_rule_func_call(rule_var, user_binding, user_query)
+            rulecall = self.gen_rule_func_call(
+                rule_var, user_binding, user_query, incremental
+            )
             return rulecall
         else:
             return self.generic_visit(node)
@@ -6,12 +6,24 @@ import json
 import logging
 import os
 import subprocess
+from contextlib import nullcontext
+from pathlib import Path
 from time import perf_counter, process_time
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
+import numpy as np
 import pexpect
 
-from common import AnalyzeSystems
+from common import (
+    AnalyzeSystems,
+    ResourceMonitor,
+    ServerCPUProbe,
+    current_cpu_set,
+    import_time_report,
+    pin_to_cpu_set,
+)
+from generate_db import EdgeStore
+from neo4j_rules import Neo4jBulkLoader, Neo4jResultStream
 
 # Set up logging with a specific format
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
@@ -20,6 +32,12 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(m
 class AnalyzeDBs(AnalyzeSystems):
     def __init__(self, config: Dict[str, Any], environment: str):
         super().__init__(config, environment)
+        self.server_probe = ServerCPUProbe.from_config(config, environment)
+        self.resource_monitor = ResourceMonitor.from_config(config, self.server_probe)
+        # Extra per-phase columns, written after the real and CPU time columns
+        self.phase_metrics = ['ServerCPUTime'] if self.server_probe else []
+        if self.resource_monitor:
+            self.phase_metrics += ResourceMonitor.metric_names(server=self.server_probe is not None)
 
     def execute_with_timing(self, operation: callable, *args, **kwargs) -> tuple:
         """Execute an operation and measure its real and CPU time."""
@@ -33,20 +51,71 @@ class AnalyzeDBs(AnalyzeSystems):
         logging.info(f'CPU time start: {start_cpu_time}, CPU time end: {end_cpu_time}')
         return real_time, cpu_time, result
 
+    def time_phase(
+        self, timing_results: Dict[str, float], phase: str, operation: callable, *args, **kwargs
+    ) -> Any:
+        """
+        Execute an operation as a benchmarked phase and record its `{phase}RealTime` and `{phase}CPUTime`, as well as
+        its `{phase}ServerCPUTime` when a server CPU probe is configured and its peak memory and I/O when the resource
+        monitor is enabled. The CPU time of the monitor's sampler thread is not counted in `{phase}CPUTime`.
+        """
+        with self.resource_monitor or nullcontext():
+            server_start = self.server_probe.snapshot() if self.server_probe else None
+            (
+                timing_results[f'{phase}RealTime'],
+                timing_results[f'{phase}CPUTime'],
+                result,
+            ) = self.execute_with_timing(operation, *args, **kwargs)
+            if server_start is not None:
+                server_end = self.server_probe.snapshot()
+                if server_end is not None:
+                    timing_results[f'{phase}ServerCPUTime'] = server_end - server_start
+        if self.resource_monitor:
+            timing_results[f'{phase}CPUTime'] -= self.resource_monitor.sampler_cpu_time
+            timing_results.update(self.resource_monitor.metrics(phase))
+        return result
+
+    @staticmethod
+    def phases(headers: list[str]) -> list[str]:
+        """Returns the phase names of a list of timing headers, in order."""
+        return [header.removesuffix('RealTime') for header in headers if header.endswith('RealTime')]
+
     def dynamic_import(self, module_name: str, class_name: str) -> Any:
         """Dynamically import a class from a module."""
         module = importlib.import_module(module_name)
         return getattr(module, class_name)
 
-    def write_timing_results(self, timing_results: Dict[str, float], headers: list[str]) -> None:
-        """Write timing results to CSV."""
-        is_new_file = not self.timing_path.exists()
-        with open(self.timing_path, 'a', newline='') as csvfile:
+    @staticmethod
+    def operation_counts(operations: Any) -> Dict[str, Any]:
+        """Returns the counters an operations object reports for its run, e.g. `Iterations` of semi-naive evaluation."""
+        counts = getattr(operations, 'counts', None)
+        return counts() if counts else {}
+
+    def write_timing_results(
+        self,
+        timing_results: Dict[str, float],
+        headers: list[str],
+        counts: Optional[Dict[str, Any]] = None,
+        timing_path: Optional[Path] = None,
+    ) -> None:
+        """
+        Write timing results to CSV, followed by the per-phase metrics, the counters of the run and the CPU set the
+        run was pinned to. The results go to the timing file of the run unless another `timing_path` is given.
+
+        Metrics that could not be measured for a phase are left empty.
+        """
+        timing_path = timing_path or self.timing_path
+        counts = counts or {}
+        timing_results = {**timing_results, **counts}
+        headers = headers + [f'{phase}{metric}' for metric in self.phase_metrics for phase in self.phases(headers)]
+        headers += list(counts)
+        is_new_file = not timing_path.exists()
+        with open(timing_path, 'a', newline='') as csvfile:
             csv_writer = csv.writer(csvfile)
             if is_new_file:
-                csv_writer.writerow(headers)
-            csv_writer.writerow([timing_results[header] for header in headers])
-        logging.info(f'Timing results saved to: {self.timing_path}')
+                csv_writer.writerow(headers + ['CPUSet'])
+            csv_writer.writerow([timing_results.get(header, '') for header in headers] + [current_cpu_set()])
+        logging.info(f'Timing results saved to: {timing_path}')
 
     def solve_with_postgres(self) -> None:
         conn = self.connect_db(self.environment)
@@ -59,44 +128,46 @@ class AnalyzeDBs(AnalyzeSystems):
 
         results_path = self.output_folder / 'postgres_results.csv'
         timing_results = {header: 0 for header in self.headers_rdbms}
+        # 'text' parses the input file on the server, 'binary' sends the edge array encoded on the client
+        load_format = self.config.get('postgres', {}).get('loadFormat', 'text')
+        counts = {'StorageProfile': postgres_operations.storage_profile, 'LoadFormat': load_format}
 
         try:
             postgres_operations.drop_tc_path_tc_result_tables()
-            (
-                timing_results['CreateTableRealTime'],
-                timing_results['CreateTableCPUTime'],
-                _,
-            ) = self.execute_with_timing(postgres_operations.create_tc_path_table)
-            timing_results['LoadDataRealTime'], timing_results['LoadDataCPUTime'], _ = self.execute_with_timing(
-                postgres_operations.import_data_from_tsv,
-                'edge',
-                f'{self.input_path}',
-            )
-            (
-                timing_results['CreateIndexRealTime'],
-                timing_results['CreateIndexCPUTime'],
-                _,
-            ) = self.execute_with_timing(postgres_operations.create_tc_path_index)
-            timing_results['AnalyzeRealTime'], timing_results['AnalyzeCPUTime'], _ = self.execute_with_timing(
-                postgres_operations.analyze_tc_path_table
+            self.time_phase(timing_results, 'CreateTable', postgres_operations.create_tc_path_table)
+            if load_format == 'binary':
+                self.time_phase(
+                    timing_results,
+                    'LoadData',
+                    postgres_operations.import_data_from_array,
+                    'edge',
+                    self.load_edge_array(),
+                )
+            else:
+                self.time_phase(
+                    timing_results,
+                    'LoadData',
+                    postgres_operations.import_data_from_tsv,
+                    'edge',
+                    f'{self.input_path}',
+                )
+            self.time_phase(timing_results, 'CreateIndex', postgres_operations.create_tc_path_index)
+            self.time_phase(timing_results, 'Analyze', postgres_operations.analyze_tc_path_table)
+            self.time_phase(timing_results, 'ExecuteQuery', postgres_operations.run_recursive_query)
+            self.time_phase(
+                timing_results,
+                'WriteResult',
+                postgres_operations.export_transitive_closure_results,
+                results_path,
             )
-            (
-                timing_results['ExecuteQueryRealTime'],
-                timing_results['ExecuteQueryCPUTime'],
-                _,
-            ) = self.execute_with_timing(postgres_operations.run_recursive_query)
-            (
-                timing_results['WriteResultRealTime'],
-                timing_results['WriteResultCPUTime'],
-                _,
-            ) = self.execute_with_timing(postgres_operations.export_transitive_closure_results, results_path)
             postgres_operations.drop_tc_path_tc_result_tables()
         except Exception as e:
             logging.error(f'PostgreSQL error: {e}')
         finally:
             conn.close()
 
-        self.write_timing_results(timing_results, self.headers_rdbms)
+        counts.update(self.operation_counts(postgres_operations))
+        self.write_timing_results(timing_results, self.headers_rdbms, counts)
 
     def solve_with_mariadb(self) -> None:
         conn = self.connect_db(self.environment)
@@ -109,45 +180,45 @@ class AnalyzeDBs(AnalyzeSystems):
 
         results_path = self.output_folder / 'mariadb_results.csv'
         timing_results = {header: 0 for header in self.headers_rdbms}
+        mariadb_config = self.config.get('mariadb', {})
+        # 'stream' fetches the result through a server-side cursor into the results file, 'outfile' writes it on the
+        # server with INTO OUTFILE and copies it over
+        stream_export = mariadb_config.get('exportStrategy', 'stream') == 'stream'
 
         try:
             mariadb_operations.drop_tc_path_tc_result_tables()
             mariadb_operations.set_standard_cte_to_zero()
-            (
-                timing_results['CreateTableRealTime'],
-                timing_results['CreateTableCPUTime'],
-                _,
-            ) = self.execute_with_timing(mariadb_operations.create_tc_path_table)
-            timing_results['LoadDataRealTime'], timing_results['LoadDataCPUTime'], _ = self.execute_with_timing(
+            self.time_phase(timing_results, 'CreateTable', mariadb_operations.create_tc_path_table)
+            self.time_phase(
+                timing_results,
+                'LoadData',
                 mariadb_operations.import_data_from_file,
                 'edge',
                 f'{self.input_path}',
             )
-            (
-                timing_results['CreateIndexRealTime'],
-                timing_results['CreateIndexCPUTime'],
-                _,
-            ) = self.execute_with_timing(mariadb_operations.create_tc_path_index)
-            timing_results['AnalyzeRealTime'], timing_results['AnalyzeCPUTime'], _ = self.execute_with_timing(
-                mariadb_operations.analyze_tc_path_table
-            )
-            (
-                timing_results['ExecuteQueryRealTime'],
-                timing_results['ExecuteQueryCPUTime'],
-                _,
-            ) = self.execute_with_timing(mariadb_operations.run_recursive_query)
-            (
-                timing_results['WriteResultRealTime'],
-                timing_results['WriteResultCPUTime'],
-                _,
-            ) = self.execute_with_timing(mariadb_operations.export_data_to_file)
+            self.time_phase(timing_results, 'CreateIndex', mariadb_operations.create_tc_path_index)
+            self.time_phase(timing_results, 'Analyze', mariadb_operations.analyze_tc_path_table)
+            self.time_phase(timing_results, 'ExecuteQuery', mariadb_operations.run_recursive_query)
+            if stream_export:
+                self.time_phase(
+                    timing_results,
+                    'WriteResult',
+                    mariadb_operations.stream_data_to_file,
+                    results_path,
+                    mariadb_config.get('fetchSize', 10000),
+                )
+            else:
+                self.time_phase(timing_results, 'WriteResult', mariadb_operations.export_data_to_file)
             mariadb_operations.drop_tc_path_tc_result_tables()
         except Exception as e:
             logging.error(f'MariaDB error: {e}')
         finally:
             conn.close()
 
-        self.write_timing_results(timing_results, self.headers_rdbms)
+        self.write_timing_results(timing_results, self.headers_rdbms, self.operation_counts(mariadb_operations))
+
+        if stream_export:
+            return
 
         self.copy_file('/tmp/mariadb_results.csv', results_path)
         machine_user_password = self.config.get('machineUserPassword', '')
@@ -157,7 +228,53 @@ class AnalyzeDBs(AnalyzeSystems):
                 remove = f'rm -rf /tmp/mariadb_results.csv'
         self.run_pexpect_command(remove, machine_user_password)
 
+    def load_edge_array(self) -> np.ndarray:
+        """
+        Returns the edges of the input graph as an (m, 2) array, memory-mapped from the canonical edge store, or
+        parsed from the input file if the graph is not in the store.
+        """
+        edge_store = EdgeStore(Path('input'))
+        if edge_store.exists(self.graph_type, self.size):
+            return edge_store.load(self.graph_type, self.size)
+        logging.warning(f'{self.graph_type} graph of size {self.size} not in the edge store, parsing {self.input_path}')
+        return np.fromfile(self.input_path, dtype=np.int64, sep=' ').reshape(-1, 2)
+
     def solve_with_duckdb(self) -> None:
+        self.run_duckdb()
+
+        sweep = self.config.get('duckdb', {}).get('sweep', {})
+        if sweep.get('threads') or sweep.get('memoryLimits'):
+            self.sweep_duckdb(sweep)
+
+    def sweep_duckdb(self, sweep: dict[str, Any]) -> None:
+        """
+        Runs the DuckDB cell again for every combination of the `threads` and `memoryLimits` of the sweep config,
+        spilling to its `tempDirectory` if set. The runs are appended to `sweep_<mode>_size_<size>.csv` next to the
+        timing file, with their `Threads` and `MemoryLimit`.
+        """
+        sweep_path = self.timing_path.with_name(
+            self.timing_path.name.replace('timing_', 'sweep_', 1).replace('_graph_', '_size_')
+        )
+        for threads in sweep.get('threads') or [None]:
+            for memory_limit in sweep.get('memoryLimits') or [None]:
+                settings = {
+                    'threads': threads,
+                    'memory_limit': memory_limit,
+                    'temp_directory': sweep.get('tempDirectory'),
+                }
+                settings = {name: value for name, value in settings.items() if value is not None}
+                logging.info(f'DuckDB sweep run with {settings}')
+                self.run_duckdb(settings, sweep_path)
+
+    def run_duckdb(self, settings: Optional[dict[str, Any]] = None, timing_path: Optional[Path] = None) -> None:
+        """
+        Runs the DuckDB rule file in a fresh database, with the given DuckDB settings if any.
+
+        Args:
+            `settings (Optional[dict[str, Any]])`: DuckDB settings to `SET` before the run. When given, the thread
+            count and memory limit of the run are written in `Threads` and `MemoryLimit` columns.
+            `timing_path (Optional[Path])`: The file to append the timings to. Defaults to the timing file.
+        """
         conn = self.connect_db(self.environment, self.rule_path)
         with open(self.rule_path, 'r') as f:
             sql_script = f.read()
@@ -168,41 +285,88 @@ class AnalyzeDBs(AnalyzeSystems):
 
         sql_commands = [f'{command.strip()};' for command in sql_script.split(';') if command.strip()]
         timing_results = {header: 0 for header in self.headers_rdbms}
+        # 'csv' runs the rule file as is, 'numpy' loads the edge array without parsing and fetches the closure as
+        # NumPy columns in place of the COPY statements
+        ingest_mode = self.config.get('duckdb', {}).get('ingestMode', 'csv')
+        phases = self.phases(self.headers_rdbms)
+        result = None
+        counts = {'IngestMode': ingest_mode}
 
         try:
+            if settings is not None:
+                for name, value in settings.items():
+                    conn.execute(f"SET {name} = '{value}';")
+                threads, memory_limit = conn.execute(
+                    "SELECT current_setting('threads'), current_setting('memory_limit');"
+                ).fetchone()
+                counts['Threads'] = threads
+                counts['MemoryLimit'] = settings.get('memory_limit', memory_limit)
 
             for i, command in enumerate(sql_commands):
                 try:
-                    (
-                        timing_results[self.headers_rdbms[2 * i]],
-                        timing_results[self.headers_rdbms[2 * i + 1]],
-                        _,
-                    ) = self.execute_with_timing(conn.execute, command)
+                    if ingest_mode == 'numpy' and phases[i] == 'LoadData':
+                        self.time_phase(timing_results, 'LoadData', self.duckdb_load_array, conn)
+                    elif ingest_mode == 'numpy' and phases[i] == 'WriteResult':
+                        result = self.time_phase(timing_results, 'WriteResult', self.duckdb_fetch_result, conn)
+                    else:
+                        self.time_phase(timing_results, phases[i], conn.execute, command)
                 except Exception as e:
                     logging.error(f'Error executing command: {command}. Error: {e}')
         except Exception as e:
             logging.error(f'Error from DuckDB: {e}')
         finally:
             conn.close()
+            # Remove the database file, so that the next run of this process starts from an empty database
+            self.close()
+
+        self.write_timing_results(timing_results, self.headers_rdbms, counts, timing_path)
+
+        if result is not None:
+            # Written after timing, so that the fetch time excludes any CSV formatting
+            np.savetxt(
+                results_path,
+                np.column_stack((result['x'], result['y'])),
+                fmt='%d',
+                delimiter=',',
+                header='x,y',
+                comments='',
+            )
+
+    def duckdb_load_array(self, conn: Any) -> None:
+        """Registers the edge array as a relation and inserts it into the edge table, without parsing any text."""
+        edges = self.load_edge_array()
+        conn.register('edge_array', {'x': edges[:, 0], 'y': edges[:, 1]})
+        conn.execute('INSERT INTO edge SELECT x, y FROM edge_array;')
+        conn.unregister('edge_array')
 
-        self.write_timing_results(timing_results, self.headers_rdbms)
+    def duckdb_fetch_result(self, conn: Any) -> dict[str, np.ndarray]:
+        """Fetches the transitive closure as NumPy columns."""
+        return conn.execute('SELECT * FROM tc_result;').fetchnumpy()
 
     def solve_with_neo4j(self) -> None:
         self.driver = self.connect_db(self.environment)
         results_path = self.output_folder / 'neo4j_results.csv'
 
         machine_user_password = self.config.get('machineUserPassword', '')
-        neo4j_import_dir = self.config.get('neo4j', {}).get('import_directory', '')
+        neo4j_config = self.config.get('neo4j', {})
+        neo4j_import_dir = neo4j_config.get('import_directory', '')
         fact_file_name = os.path.basename(self.input_path)
+        # 'unwind' loads the edges from Python in parameter batches after creating the constraint on Node.id,
+        # 'loadCsv' runs the LOAD CSV statement of the rule file
+        bulk_load = neo4j_config.get('loadStrategy', 'unwind') == 'unwind'
+        # 'stream' runs the query once and writes the CSV from the driver's cursor, 'apoc' runs the query and then
+        # exports it again with apoc.export.csv.query into the import directory
+        stream_export = neo4j_config.get('exportStrategy', 'stream') == 'stream'
 
         # Use just the filename for Neo4j export (it will write to import directory)
         export_filename = f'neo4j_export_{os.getpid()}.csv'
 
-        copy_cmd = f'cp {self.input_path.resolve()} {neo4j_import_dir}/'
-        if os.name == 'posix' and 'darwin' in os.uname().sysname.lower():
-            subprocess.run(copy_cmd, shell=True, text=True, capture_output=True, check=True)
-        else:
-            self.run_pexpect_command(f'sudo {copy_cmd}', machine_user_password)
+        if not bulk_load:
+            copy_cmd = f'cp {self.input_path.resolve()} {neo4j_import_dir}/'
+            if os.name == 'posix' and 'darwin' in os.uname().sysname.lower():
+                subprocess.run(copy_cmd, shell=True, text=True, capture_output=True, check=True)
+            else:
+                self.run_pexpect_command(f'sudo {copy_cmd}', machine_user_password)
 
         with open(self.rule_path, 'r') as f:
             cypher_script = f.read()
@@ -215,41 +379,42 @@ class AnalyzeDBs(AnalyzeSystems):
         timing_results = {header: 0 for header in self.headers_neo4j}
 
         session = self.driver.session()
+        loader = Neo4jBulkLoader(self.config, session, neo4j_config.get('loadBatchSize', 10000))
+        stream = Neo4jResultStream(session)
         try:
-            # Execute setup commands (DELETE, LOAD CSV, CREATE INDEX)
-            for i, command in enumerate(commands[:-2]):
-                (
-                    timing_results[self.headers_neo4j[2 * i]],
-                    timing_results[self.headers_neo4j[2 * i + 1]],
-                    _,
-                ) = self.execute_with_timing(session.run, command)
-
-                logging.info(f'Command: {command}. Time: {self.headers_neo4j[2 * i]}, {self.headers_neo4j[2 * i + 1]}')
+            if bulk_load:
+                self.time_phase(timing_results, 'DeleteData', session.run, commands[0])
+                self.time_phase(timing_results, 'CreateIndexX', loader.create_node_constraint)
+                self.time_phase(timing_results, 'LoadData', loader.load_data, str(self.input_path))
+            else:
+                loader.drop_node_constraint()
+                # Execute setup commands (DELETE, LOAD CSV, CREATE INDEX)
+                for i, command in enumerate(commands[:-2]):
+                    self.time_phase(timing_results, self.phases(self.headers_neo4j)[i], session.run, command)
+
+                    logging.info(
+                        f'Command: {command}. Time: {self.headers_neo4j[2 * i]}, {self.headers_neo4j[2 * i + 1]}'
+                    )
 
             # Execute the transitive closure query (penultimate command)
             query = commands[-2]
             try:
-                (
-                    timing_results[self.headers_neo4j[-4]],
-                    timing_results[self.headers_neo4j[-3]],
-                    _,
-                ) = self.execute_with_timing(session.run, query)
+                self.time_phase(timing_results, 'Query', stream.run_query if stream_export else session.run, query)
                 logging.info(f'Query executed: {query}')
             except Exception as e:
                 logging.error(f'Penultimate Neo4J query error: {e}, Query: {query}')
 
-            # Execute the export command (last command)
+            # Write the streamed result, or execute the export command (last command)
             export_command = commands[-1]
             try:
-                (
-                    timing_results[self.headers_neo4j[-2]],
-                    timing_results[self.headers_neo4j[-1]],
-                    result,
-                ) = self.execute_with_timing(session.run, export_command)
-
-                logging.info(f'Command and Result Neo4J: {result} from query: {export_command}')
-                for rec in result:
-                    logging.info(f'Record: {rec}')
+                if stream_export:
+                    self.time_phase(timing_results, 'WriteResult', stream.write_csv, results_path)
+                else:
+                    result = self.time_phase(timing_results, 'WriteResult', session.run, export_command)
+
+                    logging.info(f'Command and Result Neo4J: {result} from query: {export_command}')
+                    for rec in result:
+                        logging.info(f'Record: {rec}')
             except Exception as e:
                 logging.error(f'Last Neo4J export error: {e}, Query: {export_command}')
 
@@ -260,23 +425,35 @@ class AnalyzeDBs(AnalyzeSystems):
             session.close()
             self.driver.close()
 
-        self.write_timing_results(timing_results, self.headers_neo4j)
-
-        # Copy the exported file from Neo4j import directory to the desired location
-        export_source = f'{neo4j_import_dir}/{export_filename}'
-        copy_result_cmd = f'cp {export_source} {results_path}'
-        try:
-            subprocess.run(copy_result_cmd, shell=True, text=True, capture_output=True, check=True)
-            logging.info(f'Copied results from {export_source} to {results_path}')
-        except Exception as e:
-            logging.error(f'Error copying Neo4j results: {e}')
+        counts = {}
+        if bulk_load:
+            counts.update(self.operation_counts(loader))
+        if stream_export:
+            counts.update(self.operation_counts(stream))
+        self.write_timing_results(timing_results, self.headers_neo4j, counts)
+
+        # Files in the Neo4j import directory, which only the LOAD CSV and APOC paths use
+        cleanup_files = []
+        if not stream_export:
+            # Copy the exported file from Neo4j import directory to the desired location
+            export_source = f'{neo4j_import_dir}/{export_filename}'
+            copy_result_cmd = f'cp {export_source} {results_path}'
+            try:
+                subprocess.run(copy_result_cmd, shell=True, text=True, capture_output=True, check=True)
+                logging.info(f'Copied results from {export_source} to {results_path}')
+            except Exception as e:
+                logging.error(f'Error copying Neo4j results: {e}')
+            cleanup_files.append(export_source)
+        if not bulk_load:
+            cleanup_files.append(f'{neo4j_import_dir}/{fact_file_name}')
 
         # Clean up files from Neo4j import directory
-        rm_cmd = f'rm {neo4j_import_dir}/{fact_file_name} {export_source}'
-        if os.name == 'posix' and 'darwin' in os.uname().sysname.lower():
-            subprocess.run(rm_cmd, shell=True, text=True, capture_output=True, check=True)
-        else:
-            self.run_pexpect_command(f'sudo {rm_cmd}', machine_user_password)
+        if cleanup_files:
+            rm_cmd = f'rm {" ".join(cleanup_files)}'
+            if os.name == 'posix' and 'darwin' in os.uname().sysname.lower():
+                subprocess.run(rm_cmd, shell=True, text=True, capture_output=True, check=True)
+            else:
+                self.run_pexpect_command(f'sudo {rm_cmd}', machine_user_password)
 
     def solve_with_mongodb(self) -> None:
         db = self.connect_db(self.environment)
@@ -291,33 +468,15 @@ class AnalyzeDBs(AnalyzeSystems):
         timing_results = {header: 0 for header in self.headers_mongodb}
 
         try:
-            (
-                timing_results['CreateTableRealTime'],
-                timing_results['CreateTableCPUTime'],
-                _,
-            ) = self.execute_with_timing(mongo_operations.create_collection, 'edge', 'tc_result')
-            timing_results['LoadDataRealTime'], timing_results['LoadDataCPUTime'], _ = self.execute_with_timing(
-                mongo_operations.insert_data, 'edge', self.input_path
-            )
-            (
-                timing_results['CreateIndexRealTime'],
-                timing_results['CreateIndexCPUTime'],
-                _,
-            ) = self.execute_with_timing(mongo_operations.create_index, 'edge')
-            (
-                timing_results['ExecuteQueryRealTime'],
-                timing_results['ExecuteQueryCPUTime'],
-                _,
-            ) = self.execute_with_timing(mongo_operations.recursive_query, 'edge', 'tc_result')
-            (
-                timing_results['WriteResultRealTime'],
-                timing_results['WriteResultCPUTime'],
-                _,
-            ) = self.execute_with_timing(mongo_operations.export_to_csv, 'tc_result', results_path)
+            self.time_phase(timing_results, 'CreateTable', mongo_operations.create_collection, 'edge', 'tc_result')
+            self.time_phase(timing_results, 'LoadData', mongo_operations.insert_data, 'edge', self.input_path)
+            self.time_phase(timing_results, 'CreateIndex', mongo_operations.create_index, 'edge')
+            self.time_phase(timing_results, 'ExecuteQuery', mongo_operations.recursive_query, 'edge', 'tc_result')
+            self.time_phase(timing_results, 'WriteResult', mongo_operations.export_to_csv, 'tc_result', results_path)
         except Exception as e:
             logging.error(f'MongoDB error: {e}')
 
-        self.write_timing_results(timing_results, self.headers_mongodb)
+        self.write_timing_results(timing_results, self.headers_mongodb, self.operation_counts(mongo_operations))
         logging.info(f'(MongoDB) Experiment timing results saved to: {self.timing_path}')
 
     def solve_with_cockroachdb(self) -> None:
@@ -332,61 +491,79 @@ class AnalyzeDBs(AnalyzeSystems):
         results_path = self.output_folder / 'cockroachdb_results.csv'
         timing_results = {header: 0 for header in self.headers_rdbms}
 
-        try:
-            cockroachdb_operations.drop_tc_path_tc_result_tables()
-            external_directory = self.config.get(self.environment, {}).get("externalDirectory", '')
-
-            (
-                timing_results['CreateTableRealTime'],
-                timing_results['CreateTableCPUTime'],
-                _,
-            ) = self.execute_with_timing(cockroachdb_operations.create_tc_path_table)
-
-            cmd = f'mkdir -p {external_directory} && cp {self.input_path} {external_directory}'
-            subprocess.run(cmd, shell=True, text=True, capture_output=True, check=True)
-
-            filename = f'{self.input_path.stem + self.input_path.suffix}'
-            timing_results['LoadDataRealTime'], timing_results['LoadDataCPUTime'], _ = self.execute_with_timing(
-                cockroachdb_operations.import_data_from_tsv, 'edge', filename
-            )
-
-            cmd = f'rm -r {external_directory}{filename}'
-            subprocess.run(cmd, shell=True, text=True, capture_output=True, check=True)
-
-            (
-                timing_results['CreateIndexRealTime'],
-                timing_results['CreateIndexCPUTime'],
-                _,
-            ) = self.execute_with_timing(cockroachdb_operations.create_tc_path_index)
-            timing_results['AnalyzeRealTime'], timing_results['AnalyzeCPUTime'], _ = self.execute_with_timing(
-                cockroachdb_operations.analyze_tc_path_table
-            )
-            (
-                timing_results['ExecuteQueryRealTime'],
-                timing_results['ExecuteQueryCPUTime'],
-                _,
-            ) = self.execute_with_timing(cockroachdb_operations.run_recursive_query)
-            (
-                timing_results['WriteResultRealTime'],
-                timing_results['WriteResultCPUTime'],
-                _,
-            ) = self.execute_with_timing(cockroachdb_operations.export_transitive_closure_results, results_path)
+        cockroachdb_config = self.config.get(self.environment, {})
+        external_directory = cockroachdb_config.get("externalDirectory", '')
+        # 'copy' streams the data through the connection with COPY, 'import' and 'export' go through the files of
+        # the node's external directory with IMPORT INTO and EXPORT INTO CSV
+        load_strategy = cockroachdb_config.get('loadStrategy', 'copy')
+        export_strategy = cockroachdb_config.get('exportStrategy', 'copy')
+        buffer_size = cockroachdb_config.get('copyBufferSize', 1 << 16)
+        counts = {'LoadStrategy': load_strategy, 'ExportStrategy': export_strategy}
 
+        try:
             cockroachdb_operations.drop_tc_path_tc_result_tables()
 
-            external_dir = f'{external_directory}tmp/*.csv'
-
-            logging.info(f'External directory: {external_dir}')
-            cp_cmd = f'cp {external_dir} {results_path}'
-            rm_cmd = f'rm -rf {external_directory}tmp'
-            subprocess.run(cp_cmd, shell=True, text=True, capture_output=True, check=True)
-            self.run_pexpect_command(rm_cmd, '')
+            self.time_phase(timing_results, 'CreateTable', cockroachdb_operations.create_tc_path_table)
+
+            if load_strategy == 'copy':
+                self.time_phase(
+                    timing_results,
+                    'LoadData',
+                    cockroachdb_operations.copy_data_from_tsv,
+                    'edge',
+                    self.input_path,
+                    buffer_size,
+                )
+            else:
+                cmd = f'mkdir -p {external_directory} && cp {self.input_path} {external_directory}'
+                subprocess.run(cmd, shell=True, text=True, capture_output=True, check=True)
+
+                filename = f'{self.input_path.stem + self.input_path.suffix}'
+                self.time_phase(
+                    timing_results, 'LoadData', cockroachdb_operations.import_data_from_tsv, 'edge', filename
+                )
+
+                cmd = f'rm -r {external_directory}{filename}'
+                subprocess.run(cmd, shell=True, text=True, capture_output=True, check=True)
+
+            self.time_phase(timing_results, 'CreateIndex', cockroachdb_operations.create_tc_path_index)
+            self.time_phase(timing_results, 'Analyze', cockroachdb_operations.analyze_tc_path_table)
+            self.time_phase(timing_results, 'ExecuteQuery', cockroachdb_operations.run_recursive_query)
+
+            if export_strategy == 'copy':
+                self.time_phase(
+                    timing_results,
+                    'WriteResult',
+                    cockroachdb_operations.copy_data_to_csv,
+                    'SELECT * FROM tc_result',
+                    results_path,
+                    buffer_size,
+                )
+                cockroachdb_operations.drop_tc_path_tc_result_tables()
+            else:
+                self.time_phase(
+                    timing_results,
+                    'WriteResult',
+                    cockroachdb_operations.export_transitive_closure_results,
+                    results_path,
+                )
+
+                cockroachdb_operations.drop_tc_path_tc_result_tables()
+
+                external_dir = f'{external_directory}tmp/*.csv'
+
+                logging.info(f'External directory: {external_dir}')
+                cp_cmd = f'cp {external_dir} {results_path}'
+                rm_cmd = f'rm -rf {external_directory}tmp'
+                subprocess.run(cp_cmd, shell=True, text=True, capture_output=True, check=True)
+                self.run_pexpect_command(rm_cmd, '')
         except Exception as e:
             logging.error(f'CockroachDB error: {e}')
         finally:
             conn.close()
 
-        self.write_timing_results(timing_results, self.headers_rdbms)
+        counts.update(self.operation_counts(cockroachdb_operations))
+        self.write_timing_results(timing_results, self.headers_rdbms, counts)
         logging.info(f'(CockroachDB) Experiment timing results saved to: {self.timing_path}')
 
     def run_pexpect_command(self, command: str, password: str) -> None:
@@ -450,6 +627,15 @@ class AnalyzeDBs(AnalyzeSystems):
         self.close()
 
 
+def run_experiment(config: Dict[str, Any], environment: str, size: int, mode: str, graph_type: str) -> None:
+    """Runs a single experiment for a database system and appends its timings to the CSV file."""
+    analyze_dbs = AnalyzeDBs(config, environment)
+    analyze_dbs.set_file_paths(mode, graph_type, size, config.get('timing_dir', 'timing'))
+    analyze_dbs.set_output_folder()
+    analyze_dbs.analyze()
+    logging.info(f'Driver import times:\n{import_time_report()}')
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument('--config', type=str, required=True, help='JSON string of the config')
@@ -470,10 +656,8 @@ def main() -> None:
 
     config = json.loads(args.config)
 
-    analyze_dbs = AnalyzeDBs(config, args.environment)
-    analyze_dbs.set_file_paths(args.mode, args.graph_type, args.size, config.get('timing_dir', 'timing'))
-    analyze_dbs.set_output_folder()
-    analyze_dbs.analyze()
+    pin_to_cpu_set()
+    run_experiment(config, args.environment, args.size, args.mode, args.graph_type)
 
 
 if __name__ == '__main__':
@@ -1,17 +1,26 @@
 import argparse
 import csv
 import gc
+import hashlib
 import json
 import logging
 import os
 import re
+import shutil
 import subprocess
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Iterator, List, Optional
 
-import clingo
-
-from common import AnalyzeSystems
+from common import (
+    AnalyzeSystems,
+    ResourceMonitor,
+    current_cpu_set,
+    import_driver,
+    import_time_report,
+    pin_to_cpu_set,
+)
 
 # Set up logging with a specific format
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
@@ -28,6 +37,9 @@ class AnalyzeLogicSystems(AnalyzeSystems):
         super().__init__(config, environment)
         self.souffle_include_dir = souffle_include_dir
         self.queries = queries  # Each query is a list: [Identifier, Query]
+        self.resource_monitor = ResourceMonitor.from_config(config)
+        self.resource_metrics: dict[str, int] = {}
+        self.sampler_cpu_times: dict[str, float] = {}
 
     def analyze(self) -> None:
         """Executes the appropriate solve method based on the environment."""
@@ -47,14 +59,50 @@ class AnalyzeLogicSystems(AnalyzeSystems):
         match = re.search(pattern, text)
         return float(match.group(1)) if match else None
 
-    def write_to_csv(self, headers: List[str], data: List[Any], file_path: Path) -> None:
-        """Write data to a CSV file."""
+    @contextmanager
+    def measure_resources(self, phase: str) -> Iterator[None]:
+        """
+        Records the peak memory and I/O of a phase, if the resource monitor is enabled, and the CPU time its sampler
+        thread spent during the phase.
+        """
+        if self.resource_monitor is None:
+            yield
+            return
+        with self.resource_monitor:
+            yield
+        self.resource_metrics.update(self.resource_monitor.metrics(phase))
+        self.sampler_cpu_times[phase] = self.resource_monitor.sampler_cpu_time
+
+    def without_sampler_cpu(self, phase: str, timing: tuple[float, float]) -> tuple[float, float]:
+        """Returns the real and CPU time of a phase, without the CPU time of the resource monitor's sampler thread."""
+        real_time, cpu_time = timing
+        return real_time, cpu_time - self.sampler_cpu_times.get(phase, 0.0)
+
+    def souffle_timing(self, phase: str, result: str) -> List[Any]:
+        """Splits the timing of a Souffle command, without the sampler's CPU time if the command succeeded."""
+        fields = result.split(',')
+        if len(fields) != 2 or phase not in self.sampler_cpu_times:
+            return fields
+        return list(self.without_sampler_cpu(phase, (float(fields[0]), float(fields[1]))))
+
+    def write_to_csv(
+        self, headers: List[str], data: List[Any], file_path: Path, resource_phases: Optional[List[str]] = None
+    ) -> None:
+        """
+        Write data to a CSV file, followed by the resource metrics of the given phases and the CPU set the run was
+        pinned to. Metrics of phases that did not run are left empty.
+        """
+        if self.resource_monitor is not None:
+            metrics = ResourceMonitor.metric_names()
+            columns = [f'{phase}{metric}' for metric in metrics for phase in resource_phases or []]
+            headers = headers + columns
+            data = data + [self.resource_metrics.get(column, '') for column in columns]
         is_new_file = not file_path.exists()
         with open(file_path, 'a', newline='') as csvfile:
             writer = csv.writer(csvfile)
             if is_new_file:
-                writer.writerow(headers)
-            writer.writerow(data)
+                writer.writerow(headers + ['CPUSet'])
+            writer.writerow(data + [current_cpu_set()])
 
     def solve_with_xsb(self) -> None:
         """Executes a query using XSB Prolog and logs the time taken for various stages."""
@@ -65,50 +113,41 @@ class AnalyzeLogicSystems(AnalyzeSystems):
         xsb_export_path = self.rule_path.parent / 'xsb_export'
         results_path = self.output_folder / 'xsb_results.txt'
 
-        xsb_commands = [
-            [
-                'xsb',
-                '--nobanner',
-                '--quietload',
-                '--noprompt',
-                '-e',
-                f"add_lib_dir('{xsb_export_path}').",
-                '-e',
-                f"extfilequery:external_file_query_only('{self.rule_path}','{self.input_path}',{self.queries},'{results_path}').",
-            ],
-            [
-                'xsb',
-                '--nobanner',
-                '--quietload',
-                '--noprompt',
-                '-e',
-                f"add_lib_dir('{xsb_export_path}').",
-                '-e',
-                f"extfilequery:external_file_query('{self.rule_path}','{self.input_path}',{self.queries},'{results_path}').",
-            ],
+        # Load a private copy of the rules so that the .xwam compiled from it is not shared with concurrent runs
+        rule_path = self.output_folder / self.rule_path.name
+        shutil.copyfile(self.rule_path, rule_path)
+
+        xsb_command = [
+            'xsb',
+            '--nobanner',
+            '--quietload',
+            '--noprompt',
+            '-e',
+            f"add_lib_dir('{xsb_export_path}').",
+            '-e',
+            f"extfilequery:external_file_query_timed('{rule_path}','{self.input_path}',{self.queries},'{results_path}').",
         ]
 
-        outputs = [self.run_subprocess(cmd) for cmd in xsb_commands]
+        with self.measure_resources('Run'):
+            output = self.run_subprocess(xsb_command)
 
-        logging.info(f'(XSB) Command output: {outputs[0].stdout}')
-        logging.info(f'(XSB) Error output: {outputs[0].stderr}')
-        logging.info(f'(XSB) Command output 2: {outputs[1].stdout}')
-        logging.info(f'(XSB) Error output 2: {outputs[1].stderr}')
+        logging.info(f'(XSB) Command output: {output.stdout}')
+        logging.info(f'(XSB) Error output: {output.stderr}')
 
         timings = [
-            ('LoadRuleTime', outputs[0].stdout),
-            ('CPULoadRuleTime', outputs[0].stdout),
-            ('LoadFactsTime', outputs[0].stdout),
-            ('CPULoadFactsTime', outputs[0].stdout),
-            ('QueryOnlyTime', outputs[0].stdout),
-            ('CPUQueryOnlyTime', outputs[0].stdout),
-            ('QueryAndWriteTime', outputs[1].stdout),
-            ('CPUTimeQueryAndWriteTime', outputs[1].stdout),
+            'LoadRuleTime',
+            'CPULoadRuleTime',
+            'LoadFactsTime',
+            'CPULoadFactsTime',
+            'QueryOnlyTime',
+            'CPUQueryOnlyTime',
+            'WriteTime',
+            'CPUWriteTime',
         ]
 
-        timing_results = [self.extract_timing(rf'{name}:\s+(-?\d+\.\d+(?:e[+-]?\d+)?)', text) for name, text in timings]
-        write_time = float(timing_results[6]) - float(timing_results[4])
-        cpu_write_time = float(timing_results[7]) - float(timing_results[5])
+        timing_results = [
+            self.extract_timing(rf'(?m)^{name}:\s+(-?\d+\.\d+(?:e[+-]?\d+)?)', output.stdout) for name in timings
+        ]
 
         self.write_to_csv(
             [
@@ -128,54 +167,59 @@ class AnalyzeLogicSystems(AnalyzeSystems):
                 float(timing_results[3]),
                 float(timing_results[4]),
                 float(timing_results[5]),
-                write_time,
-                cpu_write_time,
+                float(timing_results[6]),
+                float(timing_results[7]),
             ],
             self.timing_path,
+            ['Run'],
         )
 
         logging.info(f'(XSB) Experiment timing results saved to: {self.timing_path}')
 
-        # Clean up .xwam files
-        for f in self.rule_path.parent.glob('*.xwam'):
-            f.unlink()
-        for f in xsb_export_path.glob('*.xwam'):
-            f.unlink()
+        # Clean up the rule copy and its .xwam file
+        rule_path.unlink()
+        rule_path.with_suffix('.xwam').unlink(missing_ok=True)
 
         gc.collect()
 
     def solve_with_clingo(self) -> None:
         """Executes a query using Clingo and logs the time taken for loading and querying."""
         try:
+            clingo = import_driver('clingo')
             ctl = clingo.Control()
             temp_rule_file_path = self.replace_rule_file_content(self.rule_path, self.environment, self.queries)
             rule_file = temp_rule_file_path if temp_rule_file_path else str(self.rule_path)
             # Load facts and rules
-            t_load_rule_begin = os.times()
-            ctl.load(rule_file)
-            t_load_rule_end = os.times()
-
-            t_load_facts_begin = os.times()
-            ctl.load(str(self.input_path))
-            t_load_facts_end = os.times()
-
-            t_ground_begin = os.times()
-            ctl.ground([('base', [])])
-            t_ground_end = os.times()
-
-            t_query_begin = os.times()
-            ctl.configuration.solve.models = '0'
-            with ctl.solve(yield_=True) as handle:
-                # Collect results first
-                results = [model.symbols(shown=True) for model in handle]
-            t_query_end = os.times()
+            with self.measure_resources('LoadRules'):
+                t_load_rule_begin = os.times()
+                ctl.load(rule_file)
+                t_load_rule_end = os.times()
+
+            with self.measure_resources('LoadFacts'):
+                t_load_facts_begin = os.times()
+                ctl.load(str(self.input_path))
+                t_load_facts_end = os.times()
+
+            with self.measure_resources('Ground'):
+                t_ground_begin = os.times()
+                ctl.ground([('base', [])])
+                t_ground_end = os.times()
+
+            with self.measure_resources('Query'):
+                t_query_begin = os.times()
+                ctl.configuration.solve.models = '0'
+                with ctl.solve(yield_=True) as handle:
+                    # Collect results first
+                    results = [model.symbols(shown=True) for model in handle]
+                t_query_end = os.times()
 
             # Now write the results to a file
             output_file = self.output_folder / 'clingo_results.txt'
-            t_query_w_begin = os.times()
-            with open(output_file, 'w') as f:
-                f.writelines([f'{atom}\n' for result in results for atom in result])
-            t_query_w_end = os.times()
+            with self.measure_resources('Write'):
+                t_query_w_begin = os.times()
+                with open(output_file, 'w') as f:
+                    f.writelines([f'{atom}\n' for result in results for atom in result])
+                t_query_w_end = os.times()
 
             logging.info(f'(Clingo) Results written to: {output_file}')
 
@@ -186,6 +230,11 @@ class AnalyzeLogicSystems(AnalyzeSystems):
                 'Query': self.estimate_time_duration(t_query_begin, t_query_end),
                 'QueryWrite': self.estimate_time_duration(t_query_w_begin, t_query_w_end),
             }
+            # The QueryWrite timing is taken around the Write phase
+            timings = {
+                name: self.without_sampler_cpu('Write' if name == 'QueryWrite' else name, timing)
+                for name, timing in timings.items()
+            }
 
             write_time = float(timings['QueryWrite'][0] - timings['Query'][0])
             write_cpu_time = float(timings['QueryWrite'][1] - timings['Query'][1])
@@ -216,6 +265,7 @@ class AnalyzeLogicSystems(AnalyzeSystems):
                     write_cpu_time,
                 ],
                 self.timing_path,
+                ['LoadRules', 'LoadFacts', 'Ground', 'Query', 'Write'],
             )
 
             logging.info(f'(Clingo) Experiment results saved to: {self.timing_path}')
@@ -226,29 +276,79 @@ class AnalyzeLogicSystems(AnalyzeSystems):
                 os.remove(temp_rule_file_path)
             gc.collect()
 
+    def souffle_version(self) -> str:
+        """Returns the version string reported by the installed Souffle."""
+        result = subprocess.run(['souffle', '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        return result.stdout.strip()
+
+    def souffle_cache_key(self, rule_file: Path, main_cpp_file: Path, compile_flags: List[str]) -> str:
+        """Hashes everything that determines the compiled Souffle binary."""
+        digest = hashlib.sha256()
+        digest.update(Path(rule_file).read_bytes())
+        digest.update(str(self.queries).encode())
+        digest.update(Path(main_cpp_file).read_bytes())
+        digest.update(self.souffle_version().encode())
+        digest.update(' '.join(compile_flags).encode())
+        return digest.hexdigest()
+
     def solve_with_souffle(self) -> None:
-        """Executes a Souffle program, compiles the generated C++ code, and runs the compiled program."""
+        """Executes a Souffle program, compiling the generated C++ code only when no cached binary exists."""
+        souffle_config = self.config.get('souffle', {})
+        use_cache = souffle_config.get('compileCache', True)
+        souffle_export_path = Path('souffle_rules') / 'souffle_export'
+        cache_dir = Path(souffle_config.get('cacheDirectory', souffle_export_path / 'cache'))
+        main_cpp_file = souffle_export_path / 'main.cpp'
+        compile_flags = ['-std=c++17', '-I', f'{self.souffle_include_dir}', '-D__EMBEDDED_SOUFFLE__']
+        temp_rule_file_path = None
+        build_dir = None
 
         try:
-            souffle_export_path = Path('souffle_rules') / 'souffle_export'
-            souffle_export_file = souffle_export_path / 'main'
-            generated_cpp_filename = souffle_export_path / 'souffle_generated.cpp'
-
-            # Generate C++ code from Datalog
             temp_rule_file_path = self.replace_rule_file_content(self.rule_path, self.environment, self.queries)
-            rule_file = temp_rule_file_path if temp_rule_file_path else self.rule_path
-            datalog_to_cpp_cmd = (
-                f'souffle {rule_file} -F {self.input_path} -w -g {generated_cpp_filename} -D {self.output_folder}'
-            )
-            datalog_to_cpp_result = self.run_souffle_command(datalog_to_cpp_cmd)
-
-            # Compile the generated C++ code
-            compile_cmd = f'g++ {souffle_export_file}.cpp {generated_cpp_filename} -std=c++17 -I {self.souffle_include_dir} -o {souffle_export_file} -D__EMBEDDED_SOUFFLE__'
-            compile_result = self.run_souffle_command(compile_cmd)
+            rule_file = Path(temp_rule_file_path) if temp_rule_file_path else self.rule_path
+
+            cache_key = self.souffle_cache_key(rule_file, main_cpp_file, compile_flags)
+            entry_dir = cache_dir / cache_key
+            executable = entry_dir / 'main'
+
+            datalog_to_cpp_result = ('0,0', {})
+            compile_result = ('0,0', {})
+            cached = use_cache and executable.exists()
+            if cached:
+                logging.info(f'(Souffle) Reusing cached binary: {executable}')
+            else:
+                # Build in a private directory so concurrent runs never share generated files
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                build_dir = Path(tempfile.mkdtemp(prefix=f'{cache_key}.', dir=cache_dir))
+                generated_cpp_filename = build_dir / 'souffle_generated.cpp'
+                build_executable = build_dir / 'main'
+
+                # Generate C++ code from Datalog
+                datalog_to_cpp_cmd = f'souffle {rule_file} -w -g {generated_cpp_filename}'
+                with self.measure_resources('DatalogToCPP'):
+                    datalog_to_cpp_result = self.run_souffle_command(datalog_to_cpp_cmd)
+
+                # Compile the generated C++ code
+                compile_cmd = f'g++ {main_cpp_file} {generated_cpp_filename} {" ".join(compile_flags)} -o {build_executable}'
+                with self.measure_resources('Compile'):
+                    compile_result = self.run_souffle_command(compile_cmd)
+
+                if not build_executable.exists():
+                    raise RuntimeError('Compilation did not produce an executable')
+                executable = build_executable
+                if use_cache:
+                    generated_cpp_filename.unlink(missing_ok=True)
+                    try:
+                        os.rename(build_dir, entry_dir)
+                        build_dir = None
+                        executable = entry_dir / 'main'
+                    except OSError:
+                        # Another run published the same artifact first, keep using our own build
+                        logging.info(f'(Souffle) Cache entry already exists: {entry_dir}')
 
             # Run the compiled program
-            run_cmd = f'./{souffle_export_file} {self.input_path}'
-            run_result = self.run_souffle_command(run_cmd)
+            run_cmd = f'{executable.resolve()} {self.input_path} {self.output_folder}'
+            with self.measure_resources('Run'):
+                run_result = self.run_souffle_command(run_cmd)
             logging.info(f'Results: DTC: {datalog_to_cpp_result}, CR: {compile_result}, RR: {run_result}')
 
             # Write the timing data to the output CSV file
@@ -266,10 +366,11 @@ class AnalyzeLogicSystems(AnalyzeSystems):
                     'QueryCPUTime',
                     'WritingResultRealTime',
                     'WritingResultCPUTime',
+                    'CompileCached',
                 ],
                 [
-                    *datalog_to_cpp_result[0].split(','),
-                    *compile_result[0].split(','),
+                    *self.souffle_timing('DatalogToCPP', datalog_to_cpp_result[0]),
+                    *self.souffle_timing('Compile', compile_result[0]),
                     float(run_result[1].get('Instance time', 0.0)),
                     float(run_result[1].get('InstanceCPU time', 0.0)),
                     float(run_result[1].get('LoadingFacts time', 0.0)),
@@ -278,8 +379,10 @@ class AnalyzeLogicSystems(AnalyzeSystems):
                     float(run_result[1].get('QueryCPU time', 0.0)),
                     float(run_result[1].get('Writing time', 0.0)),
                     float(run_result[1].get('WritingCPU time', 0.0)),
+                    int(cached),
                 ],
                 self.timing_path,
+                ['DatalogToCPP', 'Compile', 'Run'],
             )
 
             logging.info(f'(Souffle) Experiment timing results saved to: {self.timing_path}')
@@ -287,15 +390,31 @@ class AnalyzeLogicSystems(AnalyzeSystems):
         except Exception as e:
             logging.error(f'Error (Souffle): {e}')
         finally:
-            # Clean up generated files
-            souffle_export_file.unlink(missing_ok=True)
-            generated_cpp_filename.unlink(missing_ok=True)
+            # Clean up uncached build artifacts
+            if build_dir is not None:
+                shutil.rmtree(build_dir, ignore_errors=True)
             if temp_rule_file_path:
                 logging.info(f'Removing temporary rule file: {temp_rule_file_path}')
                 os.remove(temp_rule_file_path)
             gc.collect()
 
 
+def run_experiment(
+    config: dict[str, Any],
+    environment: str,
+    size: int,
+    mode: str,
+    graph_type: str,
+    souffle_include_dir: Optional[str] = None,
+) -> None:
+    """Runs a single experiment for a logic system and appends its timings to the CSV file."""
+    analyze_logic_systems = AnalyzeLogicSystems(config, environment, souffle_include_dir, config.get('queries', '[]'))
+    analyze_logic_systems.set_file_paths(mode, graph_type, size, config.get('timing_dir', 'timing'))
+    analyze_logic_systems.set_output_folder()
+    analyze_logic_systems.analyze()
+    logging.info(f'Driver import times:\n{import_time_report()}')
+
+
 def main() -> None:
     """Parses command-line arguments and runs an experiment."""
     parser = argparse.ArgumentParser()
@@ -324,12 +443,8 @@ def main() -> None:
 
     config = json.loads(args.config)
 
-    analyze_logic_systems = AnalyzeLogicSystems(
-        config, args.environment, args.souffle_include_dir, config.get('queries', '[]')
-    )
-    analyze_logic_systems.set_file_paths(args.mode, args.graph_type, args.size, config.get('timing_dir', 'timing'))
-    analyze_logic_systems.set_output_folder()
-    analyze_logic_systems.analyze()
+    pin_to_cpu_set()
+    run_experiment(config, args.environment, args.size, args.mode, args.graph_type, args.souffle_include_dir)
 
 
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 from typing import Any
 
-from psycopg2 import extensions
+from psycopg2 import extensions, sql
 
 from common import Base
 
@@ -18,16 +18,20 @@ class CockroachDBOperations(Base):
         self.conn = conn
         self.conn.set_session(autocommit=True)
 
-    def execute_query(self, query: str, params: Any = None) -> None:
+    def execute_query(self, query: str, params: Any = None) -> int:
         """
         Executes a SQL query.
 
         Args:
             query (str): The SQL query to execute.
             params (Any, optional): Parameters to pass to the query. Defaults to None.
+
+        Returns:
+            int: The number of rows affected by the query.
         """
         cursor = self.conn.cursor()
         cursor.execute(query, params)
+        return cursor.rowcount
 
     def import_data_from_tsv(self, table_name: str, file_path: str) -> None:
         """
@@ -44,6 +48,35 @@ class CockroachDBOperations(Base):
         """
         self.execute_query(query)
 
+    def copy_data_from_tsv(self, table_name: str, file_path: str, buffer_size: int = 8192) -> None:
+        """
+        Streams data from a TSV file into a specified table with COPY FROM STDIN, without going through the node's
+        external directory.
+
+        Args:
+            table_name (str): The name of the table to import data into.
+            file_path (str): The path to the TSV file.
+            buffer_size (int, optional): The number of bytes sent to the server per chunk. Defaults to 8192.
+        """
+        with self.conn.cursor() as cursor:
+            with open(file_path, 'r') as f:
+                cursor.copy_expert(
+                    sql.SQL('COPY {} (x, y) FROM STDIN').format(sql.Identifier(table_name)), f, size=buffer_size
+                )
+
+    def copy_data_to_csv(self, query: str, file_path: str, buffer_size: int = 8192) -> None:
+        """
+        Streams the rows of a SQL query to a CSV file with COPY TO STDOUT.
+
+        Args:
+            query (str): The SQL query to select data.
+            file_path (str): The path to the CSV file.
+            buffer_size (int, optional): The size of the file's write buffer in bytes. Defaults to 8192.
+        """
+        with self.conn.cursor() as cursor:
+            with open(file_path, 'w', buffering=buffer_size) as f:
+                cursor.copy_expert(sql.SQL('COPY ({}) TO STDOUT WITH CSV').format(sql.SQL(query)), f)
+
     def export_data_to_csv(self, table_name: str, file_path: str) -> None:
         """
         Exports data from a table to a CSV file using CockroachDB's EXPORT command.
@@ -1,19 +1,13 @@
+from common import SemiNaiveDoubleRecursion
 from cockroachdb_rules import CockroachDBOperations
 
 
-class CockroachDBDoubleRecursion(CockroachDBOperations):
-    def run_recursive_query(self) -> None:
-        """
-        Runs the double recursion query for transitive closure.
-        """
-        self.execute_query(
-            """
-        CREATE TABLE tc_result AS
-        WITH RECURSIVE tc AS (
-            SELECT x, y FROM edge
-            UNION
-            SELECT tc1.x, tc2.y FROM tc AS tc1, tc AS tc2 WHERE tc1.y = tc2.x
-        )
-        SELECT * FROM tc;
-        """
-        )
+class CockroachDBDoubleRecursion(SemiNaiveDoubleRecursion, CockroachDBOperations):
+    """
+    Double recursion for transitive closure. The database rejects a recursive CTE that references `tc` twice, so
+    it is evaluated semi-naively from the driver, see `SemiNaiveDoubleRecursion`.
+    """
+
+    def clear_table(self, table_name: str) -> None:
+        """Empties a working table with DELETE, as TRUNCATE is a schema change in CockroachDB."""
+        self.execute_query(f'DELETE FROM {table_name};')
@@ -1,21 +1,440 @@
+import importlib
 import logging
 import os
 import re
+import resource
 import subprocess
 import tempfile
+import threading
 from pathlib import Path
-from typing import Any, Optional, Union
+from time import perf_counter, thread_time
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Optional, Union
 
-import duckdb
-import MySQLdb
-import psycopg2
-import singlestoredb as s2
-from neo4j import GraphDatabase
-from pymongo import MongoClient
+if TYPE_CHECKING:
+    import duckdb
+    import MySQLdb
+    import psycopg2
+    from neo4j import Driver
+    from pymongo.database import Database
 
 # Set up logging with a specific format
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
 
+# Environment plugins: the driver module of each DB environment and the `Base` method that connects with it.
+# Drivers are imported on first use only, so runs of other systems never pay for (or require) them.
+DB_PLUGINS: dict[str, tuple[str, str]] = {
+    'duckdb': ('duckdb', '_connect_duckdb'),
+    'neo4j': ('neo4j', '_connect_neo4j'),
+    'mongodb': ('pymongo', '_connect_mongodb'),
+    'cockroachdb': ('psycopg2', '_connect_psycopg2'),
+    'postgres': ('psycopg2', '_connect_psycopg2'),
+    'mariadb': ('MySQLdb', '_connect_mariadb'),
+}
+
+# Seconds spent importing each driver module, in the order they were first used
+DRIVER_IMPORT_TIMES: dict[str, float] = {}
+
+
+def register_plugin(env_name: str, module_name: str, connect_method: str) -> None:
+    """Registers the driver module and the `Base` connect method of a DB environment."""
+    DB_PLUGINS[env_name.lower()] = (module_name, connect_method)
+
+
+def import_driver(module_name: str) -> ModuleType:
+    """Imports a driver module on first use and records how long the import took."""
+    if module_name not in DRIVER_IMPORT_TIMES:
+        start = perf_counter()
+        module = importlib.import_module(module_name)
+        DRIVER_IMPORT_TIMES[module_name] = perf_counter() - start
+        return module
+    return importlib.import_module(module_name)
+
+
+def preload_drivers(env_names: list[str]) -> None:
+    """Imports the drivers of the given environments ahead of time, skipping the ones that are not installed."""
+    for env_name in env_names:
+        plugin = DB_PLUGINS.get(env_name.lower())
+        if plugin is None:
+            continue
+        try:
+            import_driver(plugin[0])
+        except ImportError as e:
+            logging.warning(f'Driver for {env_name} is not available: {e}')
+
+
+def import_time_report() -> str:
+    """Returns the import time of each driver loaded so far, in the spirit of `python -X importtime`."""
+    lines = ['import time: self [us] | package']
+    for module_name, seconds in DRIVER_IMPORT_TIMES.items():
+        lines.append(f'import time: {seconds * 1e6:>9.0f} | {module_name}')
+    return '\n'.join(lines)
+
+
+# Environment variable through which the experiment scheduler hands a CPU set (e.g. "0-3") to an analysis process
+CPU_SET_ENV = 'TRANS_BENCH_CPU_SET'
+
+
+def format_cpu_set(cpus: set[int] | list[int]) -> str:
+    """Formats a set of CPU ids as a compact list of ranges, e.g. {0, 1, 2, 3, 8} -> "0-3 8"."""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ' '.join(f'{first}-{last}' if first != last else f'{first}' for first, last in ranges)
+
+
+def parse_cpu_set(cpu_set: str) -> set[int]:
+    """Parses a CPU set formatted by `format_cpu_set` (commas are accepted as separators too)."""
+    cpus = set()
+    for part in cpu_set.replace(',', ' ').split():
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def pin_to_cpu_set(cpus: Optional[set[int]] = None) -> None:
+    """
+    Pins the current process (and the processes it starts later) to a set of CPUs.
+
+    Without an explicit set, the one handed down by the scheduler in `CPU_SET_ENV` is used, if any.
+    """
+    if cpus is None:
+        cpu_set = os.environ.get(CPU_SET_ENV)
+        if not cpu_set:
+            return
+        cpus = parse_cpu_set(cpu_set)
+    if not hasattr(os, 'sched_setaffinity'):
+        logging.warning('CPU pinning is not supported on this platform')
+        return
+    os.sched_setaffinity(0, cpus)
+
+
+def current_cpu_set() -> str:
+    """Returns the CPU set the current process may run on, or an empty string where this is unknown."""
+    if not hasattr(os, 'sched_getaffinity'):
+        return ''
+    return format_cpu_set(os.sched_getaffinity(0))
+
+
+class ServerCPUProbe:
+    """
+    Measures the CPU time of a database server by summing utime, stime, cutime and cstime from `/proc/<pid>/stat`
+    over the server's process tree.
+
+    The server is found either by the PID file it writes or by its process name (as shown in `/proc/<pid>/comm`).
+    Children that exit between two snapshots are still accounted for, since their time moves into the cutime and
+    cstime of their parent when they are reaped.
+    """
+
+    proc_dir = Path('/proc')
+
+    def __init__(self, pid_file: Optional[str] = None, process_name: Optional[str] = None) -> None:
+        self.pid_file = pid_file
+        self.process_name = process_name
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any], env_name: str) -> Optional['ServerCPUProbe']:
+        """Creates a probe from the `serverProcess` section of an environment, or None if it cannot be used."""
+        server_process = config.get(env_name, {}).get('serverProcess', {})
+        pid_file, process_name = server_process.get('pidFile'), server_process.get('processName')
+        if not pid_file and not process_name:
+            return None
+        if not cls.proc_dir.is_dir():
+            logging.warning(f'{cls.proc_dir} is not available, server CPU time of {env_name} will not be recorded')
+            return None
+        return cls(pid_file, process_name)
+
+    @classmethod
+    def read_stat(cls, pid: int) -> Optional[tuple[int, int]]:
+        """Returns the parent PID and the utime+stime+cutime+cstime clock ticks of a process, if it still exists."""
+        try:
+            stat = (cls.proc_dir / str(pid) / 'stat').read_text()
+        except OSError:
+            return None
+        # The command name is in parentheses and may contain spaces, so split after its closing parenthesis
+        fields = stat[stat.rfind(')') + 2 :].split()
+        return int(fields[1]), sum(int(field) for field in fields[11:15])
+
+    def root_pids(self) -> set[int]:
+        """Returns the PIDs of the server processes whose trees are measured."""
+        if self.pid_file:
+            try:
+                return {int(Path(self.pid_file).read_text().split()[0])}
+            except (OSError, ValueError, IndexError) as e:
+                logging.error(f'Could not read server PID file {self.pid_file}: {e}')
+                return set()
+
+        pids = set()
+        for comm_path in self.proc_dir.glob('[0-9]*/comm'):
+            try:
+                # The kernel truncates command names to 15 characters
+                if comm_path.read_text().strip() == self.process_name[:15]:
+                    pids.add(int(comm_path.parent.name))
+            except OSError:
+                continue
+        return pids
+
+    def snapshot(self) -> Optional[float]:
+        """Returns the CPU seconds used so far by the server's process tree, or None if the server was not found."""
+        stats = self.tree_stats()
+        if stats is None:
+            return None
+        return sum(ticks for _, ticks in stats.values()) / self.clock_ticks
+
+    def tree_pids(self) -> set[int]:
+        """Returns the PIDs of the server's process tree."""
+        return set(self.tree_stats() or {})
+
+    def tree_stats(self) -> Optional[dict[int, tuple[int, int]]]:
+        """Returns the `read_stat` of every process of the server's tree, or None if the server was not found."""
+        roots = self.root_pids()
+        if not roots:
+            logging.warning(f'Server process {self.pid_file or self.process_name} not found')
+            return None
+
+        stats = {}
+        for stat_path in self.proc_dir.glob('[0-9]*/stat'):
+            stat = self.read_stat(int(stat_path.parent.name))
+            if stat is not None:
+                stats[int(stat_path.parent.name)] = stat
+
+        children: dict[int, list[int]] = {}
+        for pid, (ppid, _) in stats.items():
+            children.setdefault(ppid, []).append(pid)
+
+        tree = {}
+        stack = [pid for pid in roots if pid in stats]
+        while stack:
+            pid = stack.pop()
+            if pid in tree:
+                continue
+            tree[pid] = stats[pid]
+            stack.extend(children.get(pid, []))
+        return tree
+
+
+class ResourceMonitor:
+    """
+    Measures the peak RSS and the disk I/O of the current process tree over a phase, used as a context manager.
+
+    A sampler thread sums the VmRSS of this process and its descendants. The peak is also checked against the VmHWM
+    of this process (reset through `/proc/self/clear_refs` when the phase starts) and the maxrss of the children
+    reaped during the phase, so short-lived spikes between two samples are not missed. Read and write bytes come
+    from `/proc/self/io`, which includes the children reaped during the phase. With a `ServerCPUProbe`, the RSS of
+    the server's process tree is sampled as well.
+
+    The sampler thread runs inside the measured process, so the CPU time it uses is recorded in `sampler_cpu_time`
+    for the callers to subtract from the CPU time of the phase.
+    """
+
+    proc_dir = Path('/proc')
+
+    def __init__(self, server_probe: Optional[ServerCPUProbe] = None, sample_interval: float = 0.05) -> None:
+        self.server_probe = server_probe
+        self.sample_interval = sample_interval
+        self.peak_rss = 0
+        self.server_peak_rss = 0
+        self.read_bytes = 0
+        self.write_bytes = 0
+        self.server_pids: set[int] = set()
+        self.sampler_cpu_time = 0.0
+        self.stop_event = threading.Event()
+        self.sampler: Optional[threading.Thread] = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the process information needed by the monitor is available on this platform."""
+        return (cls.proc_dir / 'self' / 'status').exists()
+
+    @classmethod
+    def from_config(
+        cls, config: dict[str, Any], server_probe: Optional[ServerCPUProbe] = None
+    ) -> Optional['ResourceMonitor']:
+        """Creates a monitor from the `resourceMonitor` section of the config, or None if it is disabled."""
+        monitor_config = config.get('resourceMonitor', {})
+        if not monitor_config.get('enabled', True) or not cls.available():
+            return None
+        return cls(server_probe, monitor_config.get('sampleInterval', 0.05))
+
+    @classmethod
+    def read_status_kb(cls, pid: Union[int, str], field: str) -> int:
+        """Returns a kB field (e.g. VmRSS) of `/proc/<pid>/status`, or 0 if the process or field is gone."""
+        try:
+            with open(cls.proc_dir / str(pid) / 'status') as f:
+                for line in f:
+                    if line.startswith(f'{field}:'):
+                        return int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            pass
+        return 0
+
+    @classmethod
+    def descendants(cls, pid: Union[int, str]) -> list[int]:
+        """Returns the PIDs of all descendants of a process, using `/proc/<pid>/task/<tid>/children`."""
+        pids = []
+        try:
+            for children_path in (cls.proc_dir / str(pid) / 'task').glob('*/children'):
+                for child in children_path.read_text().split():
+                    pids.append(int(child))
+                    pids.extend(cls.descendants(child))
+        except OSError:
+            pass
+        return pids
+
+    @classmethod
+    def read_io(cls) -> tuple[int, int]:
+        """Returns the read_bytes and write_bytes of this process, including its reaped children."""
+        counters = {}
+        try:
+            with open(cls.proc_dir / 'self' / 'io') as f:
+                for line in f:
+                    name, _, value = line.partition(':')
+                    counters[name] = int(value)
+        except (OSError, ValueError):
+            pass
+        return counters.get('read_bytes', 0), counters.get('write_bytes', 0)
+
+    def sample(self) -> None:
+        """Samples the RSS of the process tree (and of the server) once."""
+        tree_rss = self.read_status_kb('self', 'VmRSS')
+        tree_rss += sum(self.read_status_kb(pid, 'VmRSS') for pid in self.descendants('self'))
+        self.peak_rss = max(self.peak_rss, tree_rss * 1024)
+        if self.server_pids:
+            server_rss = sum(self.read_status_kb(pid, 'VmRSS') for pid in self.server_pids)
+            self.server_peak_rss = max(self.server_peak_rss, server_rss * 1024)
+
+    def __sample_loop(self) -> None:
+        start = thread_time()
+        while not self.stop_event.wait(self.sample_interval):
+            self.sample()
+        self.sampler_cpu_time = thread_time() - start
+
+    def __enter__(self) -> 'ResourceMonitor':
+        try:
+            # Writing 5 resets the peak RSS (VmHWM) of the process to its current RSS
+            (self.proc_dir / 'self' / 'clear_refs').write_text('5')
+            self.hwm_reset = True
+        except OSError:
+            self.hwm_reset = False
+        self.peak_rss = self.server_peak_rss = 0
+        self.children_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        self.io_start = self.read_io()
+        # Resolving the server's tree scans /proc, so it is done once per phase rather than on every sample
+        self.server_pids = self.server_probe.tree_pids() if self.server_probe else set()
+
+        self.sample()
+        self.sampler_cpu_time = 0.0
+        self.stop_event.clear()
+        self.sampler = threading.Thread(target=self.__sample_loop, daemon=True)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop_event.set()
+        self.sampler.join()
+        self.sample()
+
+        if self.hwm_reset:
+            self.peak_rss = max(self.peak_rss, self.read_status_kb('self', 'VmHWM') * 1024)
+        children_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if children_maxrss > self.children_maxrss:
+            # A child reaped during the phase reached a new maximum, which is at least its own peak
+            self.peak_rss = max(self.peak_rss, children_maxrss * 1024)
+
+        read_end, write_end = self.read_io()
+        self.read_bytes = read_end - self.io_start[0]
+        self.write_bytes = write_end - self.io_start[1]
+
+    def metrics(self, phase: str) -> dict[str, int]:
+        """Returns the measurements of the last phase as `{phase}PeakRSS`, `{phase}ReadBytes`, etc. columns."""
+        metrics = {
+            f'{phase}PeakRSS': self.peak_rss,
+            f'{phase}ReadBytes': self.read_bytes,
+            f'{phase}WriteBytes': self.write_bytes,
+        }
+        if self.server_probe:
+            metrics[f'{phase}ServerPeakRSS'] = self.server_peak_rss
+        return metrics
+
+    @staticmethod
+    def metric_names(server: bool = False) -> list[str]:
+        """Returns the suffixes of the columns written by `metrics`."""
+        return ['PeakRSS', 'ReadBytes', 'WriteBytes'] + (['ServerPeakRSS'] if server else [])
+
+
+class SemiNaiveDoubleRecursion:
+    """
+    Driver-side semi-naive evaluation of the double recursion `tc(X, Y) :- tc(X, Z), tc(Z, Y)` for SQL databases
+    that reject a recursive CTE referencing `tc` twice.
+
+    `tc_result` starts as the edges and `tc_delta` holds the pairs found in the last iteration. Each iteration joins
+    the delta with `tc_result` on both sides, keeps the pairs not already known with `EXCEPT` into `tc_new`, and adds
+    them to `tc_result`, until no new pair is found. A path of length n is closed in about log2(n) iterations, so
+    the number of iterations is reported as `Iterations` next to the timings.
+
+    It is mixed into the operations classes of the DB-API drivers, whose `execute_query` must return the number of
+    rows the statement affected. The working tables are created with the `table_kind` of the class, if it has one.
+    """
+
+    iterations: Optional[int] = None
+
+    def clear_table(self, table_name: str) -> None:
+        """Empties a working table between iterations."""
+        self.execute_query(f'TRUNCATE TABLE {table_name};')
+
+    def run_recursive_query(self) -> None:
+        """
+        Runs the double recursion for transitive closure as a loop of set-oriented statements.
+        """
+        self.iterations = 0
+        for table_name in ['tc_result', 'tc_delta', 'tc_new']:
+            self.execute_query(
+                f"""
+            CREATE {getattr(self, 'table_kind', '')}TABLE {table_name}(
+                x INTEGER NOT NULL,
+                y INTEGER NOT NULL
+            );
+            """
+            )
+        delta_size = self.execute_query('INSERT INTO tc_result SELECT DISTINCT x, y FROM edge;')
+        self.execute_query('INSERT INTO tc_delta SELECT x, y FROM tc_result;')
+        self.execute_query('CREATE INDEX tc_result_xy ON tc_result(x, y);')
+        self.execute_query('CREATE INDEX tc_result_yx ON tc_result(y, x);')
+
+        while delta_size:
+            self.iterations += 1
+            delta_size = self.execute_query(
+                """
+            INSERT INTO tc_new
+            SELECT tc_delta.x, tc_result.y FROM tc_delta JOIN tc_result ON tc_delta.y = tc_result.x
+            UNION
+            SELECT tc_result.x, tc_delta.y FROM tc_result JOIN tc_delta ON tc_result.y = tc_delta.x
+            EXCEPT
+            SELECT x, y FROM tc_result;
+            """
+            )
+            logging.info(f'Semi-naive iteration {self.iterations}: {delta_size} new pairs')
+            self.clear_table('tc_delta')
+            if delta_size:
+                self.execute_query('INSERT INTO tc_result SELECT x, y FROM tc_new;')
+                self.execute_query('INSERT INTO tc_delta SELECT x, y FROM tc_new;')
+                self.clear_table('tc_new')
+
+    def counts(self) -> dict[str, Any]:
+        """Returns the counters of the last evaluation, written next to the timings."""
+        return {'Iterations': self.iterations}
+
+    def drop_tc_path_tc_result_tables(self) -> None:
+        """
+        Drop the created tables, including the working tables of the iterations.
+        """
+        super().drop_tc_path_tc_result_tables()
+        self.execute_query('DROP TABLE IF EXISTS tc_delta, tc_new;')
+
 
 class Base:
     def __init__(self, config: dict[str, Any]) -> None:
@@ -64,48 +483,47 @@ class Base:
         ]
 
     def connect_db(self, env_name: str, rule_path: Optional[str] = None) -> Union[
-        duckdb.DuckDBPyConnection,
-        GraphDatabase.driver,
-        MongoClient,
-        psycopg2.extensions.connection,
-        MySQLdb.Connection,
+        'duckdb.DuckDBPyConnection',
+        'Driver',
+        'Database',
+        'psycopg2.extensions.connection',
+        'MySQLdb.Connection',
     ]:
         env_name = env_name.lower()
-        connection_methods = {
-            'duckdb': self._connect_duckdb,
-            'neo4j': self._connect_neo4j,
-            'mongodb': self._connect_mongodb,
-            'cockroachdb': self._connect_psycopg2,
-            'postgres': self._connect_psycopg2,
-            'mariadb': self._connect_mariadb,
-        }
 
-        if env_name not in connection_methods:
+        if env_name not in DB_PLUGINS:
             raise ValueError(f"Unsupported database environment: {env_name}")
 
-        return connection_methods[env_name](env_name, rule_path)
+        _, connect_method = DB_PLUGINS[env_name]
+        return getattr(self, connect_method)(env_name, rule_path)
 
-    def _connect_duckdb(self, env_name: str, rule_path: Optional[str] = None) -> duckdb.DuckDBPyConnection:
+    def _connect_duckdb(self, env_name: str, rule_path: Optional[str] = None) -> 'duckdb.DuckDBPyConnection':
+        duckdb = import_driver('duckdb')
         if rule_path is not None:
-            self.db_path = Path(rule_path).parent / env_name / 'duckdb_file.db'
+            # One database file per process, so that concurrent runs do not share it
+            self.db_path = Path(rule_path).parent / env_name / f'duckdb_file_{os.getpid()}.db'
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
         return duckdb.connect(database=str(self.db_path) if self.db_path else ':memory:')
 
-    def _connect_neo4j(self, env_name: str, rule_path: Optional[str] = None) -> GraphDatabase.driver:
-        return GraphDatabase.driver(
+    def _connect_neo4j(self, env_name: str, rule_path: Optional[str] = None) -> 'Driver':
+        neo4j = import_driver('neo4j')
+        return neo4j.GraphDatabase.driver(
             self.config.get(env_name, {}).get('uri', ''),
             auth=(self.config.get(env_name, {}).get('user', ''), self.config.get(env_name, {}).get('password', '')),
         )
 
-    def _connect_mongodb(self, env_name: str, rule_path: Optional[str] = None) -> MongoClient:
-        self.driver = MongoClient(self.config.get(env_name, {}).get('uri', ''))
+    def _connect_mongodb(self, env_name: str, rule_path: Optional[str] = None) -> 'Database':
+        pymongo = import_driver('pymongo')
+        self.driver = pymongo.MongoClient(self.config.get(env_name, {}).get('uri', ''))
         return self.driver[self.config.get(env_name, {}).get('database', '')]
 
-    def _connect_psycopg2(self, env_name: str, rule_path: Optional[str] = None) -> psycopg2.extensions.connection:
+    def _connect_psycopg2(self, env_name: str, rule_path: Optional[str] = None) -> 'psycopg2.extensions.connection':
+        psycopg2 = import_driver('psycopg2')
         logging.info(f"Env: {env_name}")
         return psycopg2.connect(self.config.get(env_name, {}).get('dbURL', ''))
 
-    def _connect_mariadb(self, env_name: str, rule_path: Optional[str] = None) -> MySQLdb.Connection:
+    def _connect_mariadb(self, env_name: str, rule_path: Optional[str] = None) -> 'MySQLdb.Connection':
+        MySQLdb = import_driver('MySQLdb')
         return MySQLdb.connect(
             db=self.config.get(env_name, {}).get('database', ''),
             user=self.config.get(env_name, {}).get('user', ''),
@@ -131,6 +549,8 @@ class AnalyzeSystems(Base):
         self.input_path = None
         self.timing_path = None
         self.output_folder = None
+        self.graph_type = None
+        self.size = None
 
     def discover_rules(self, rules_dir: Path, extension: str) -> dict[str, Path]:
         """Discovers rule files in a directory and maps rule names to file paths."""
@@ -278,6 +698,8 @@ class AnalyzeSystems(Base):
         self.rule_path = rule_path
         self.input_path = input_path
         self.timing_path = timing_path
+        self.graph_type = graph_type
+        self.size = size
 
         logging.info(
             f'Using rule file: {self.rule_path}, input file: {self.input_path}, timing file: {self.timing_path}'
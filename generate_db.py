@@ -1,15 +1,22 @@
 import argparse
 import gc
+import hashlib
 import json
 import logging
 import math
 import os
 import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Generator
+from typing import Any, BinaryIO, Generator, Optional
+
+import numpy as np
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
 
+# Bump whenever a generator changes the graphs it produces, so that the cached inputs are regenerated
+GENERATOR_VERSION = 1
+
 
 class DataGenerator:
     """
@@ -157,6 +164,213 @@ class DataGenerator:
             for j in range((i - 1) * n + 1, (i - 1) * n + n + 1):
                 yield (j, j + n)
 
+    # Array variants of the generators above. Each returns an (m, 2) int64 array with the same edges in the same order
+    # as the matching generator, built with vectorized NumPy operations instead of Python-level loops.
+
+    @staticmethod
+    def edges_array(sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Stacks source and target node arrays into an (m, 2) edge array."""
+        return np.column_stack((sources, targets)).astype(np.int64, copy=False)
+
+    def generate_complete_array(self, n) -> np.ndarray:
+        """
+        Generate a complete graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating complete graph array for n={n}')
+        nodes = np.arange(1, n + 1, dtype=np.int64)
+        return self.edges_array(np.repeat(nodes, n), np.tile(nodes, n))
+
+    def generate_max_acyclic_array(self, n) -> np.ndarray:
+        """
+        Generate a max acyclic graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating max acyclic graph array for n={n}')
+        # Row-major indices below the diagonal are exactly the pairs (a, b) with a > b, in generator order
+        a, b = np.tril_indices(n, -1)
+        return self.edges_array(a + 1, b + 1)
+
+    def generate_cycle_array(self, n) -> np.ndarray:
+        """
+        Generate a cycle graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating cycle graph array for n={n}')
+        nodes = np.arange(1, n, dtype=np.int64)
+        return self.edges_array(np.append(nodes, n), np.append(nodes + 1, 1))
+
+    def generate_cycle_with_shortcuts_array(self, n) -> np.ndarray:
+        """
+        Generate a cycle with shortcuts graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating cycle with shortcuts graph array for n={n}')
+        skip = n // (self.k + 1)  # Number of vertices to skip for shortcuts
+        sources = np.repeat(np.arange(1, n + 1, dtype=np.int64), self.k)
+        steps = np.tile(np.arange(1, self.k + 1, dtype=np.int64), n)
+        shortcuts = self.edges_array(sources, 1 + (sources - 1 + skip * steps) % n)
+        return np.concatenate((self.generate_cycle_array(n), shortcuts))
+
+    def generate_path_array(self, n) -> np.ndarray:
+        """
+        Generate a path graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating path graph array for n={n}')
+        nodes = np.arange(1, n, dtype=np.int64)
+        return self.edges_array(nodes, nodes + 1)
+
+    def generate_multi_path_array(self, n) -> np.ndarray:
+        """
+        Generate a multi path graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating multi path graph array for n={n}')
+        nodes = np.arange(1, (n - 1) * self.k + 1, dtype=np.int64)
+        return self.edges_array(nodes, nodes + self.k)
+
+    def generate_binary_tree_array(self, n) -> np.ndarray:
+        """
+        Generate a binary tree graph with n nodes as an edge array.
+        """
+        h = math.floor(math.log2(n))
+        logging.info(f'Generating binary tree graph array for n={n} and h={h}')
+        parent_count = max(2 ** (h - 1) - 1, 0)
+        parents = np.repeat(np.arange(1, parent_count + 1, dtype=np.int64), 2)
+        return self.edges_array(parents, 2 * parents + np.tile([0, 1], parent_count))
+
+    def generate_reverse_binary_tree_array(self, n) -> np.ndarray:
+        """
+        Generate a reverse binary tree graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating reverse binary tree graph array for n={n}')
+        return self.generate_binary_tree_array(n)[:, ::-1].copy()
+
+    def generate_y_array(self, n) -> np.ndarray:
+        """
+        Generate a Y graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating Y graph array for n={n}')
+        sources = np.arange(1, n + 1, dtype=np.int64)
+        tail = np.arange(n + 2, n + self.k + 1, dtype=np.int64)
+        return np.concatenate(
+            (self.edges_array(sources, np.full(n, n + 1)), self.edges_array(tail - 1, tail))
+        )
+
+    def generate_w_array(self, n) -> np.ndarray:
+        """
+        Generate a W graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating W graph array for n={n}')
+        sources = np.repeat(np.arange(1, n + 1, dtype=np.int64), self.k)
+        steps = np.tile(np.arange(1, self.k + 1, dtype=np.int64), n)
+        return self.edges_array(sources, n + 1 + (sources + steps - 1) % n)
+
+    def generate_x_array(self, n) -> np.ndarray:
+        """
+        Generate a X graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating X graph array for n={n}')
+        sources = np.arange(1, n + 1, dtype=np.int64)
+        heads = n + 1 + np.arange(1, self.k + 1, dtype=np.int64)
+        return np.concatenate(
+            (self.edges_array(sources, np.full(n, n + 1)), self.edges_array(np.full(self.k, n + 1), heads))
+        )
+
+    def generate_star_array(self, n) -> np.ndarray:
+        """
+        Generate a star graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating star graph array for n={n}')
+        return self.edges_array(np.arange(2, n + 1, dtype=np.int64), np.ones(max(n - 1, 0), dtype=np.int64))
+
+    def generate_grid_array(self, n) -> np.ndarray:
+        """
+        Generate a grid graph with n nodes as an edge array.
+        """
+        logging.info(f'Generating grid graph array for n={n}')
+        n = int(math.sqrt(n))
+        nodes = np.arange(1, n * n + 1, dtype=np.int64)
+        # Edges (j, j+1) for rows skip the last node of every row, edges (j, j+n) for columns skip the last row
+        rows = nodes[nodes % n != 0]
+        columns = nodes[: n * (n - 1)]
+        return np.concatenate((self.edges_array(rows, rows + 1), self.edges_array(columns, columns + n)))
+
+
+def encode_edges(edges: np.ndarray, prefix: bytes, separator: bytes, suffix: bytes) -> bytes:
+    """
+    Formats an (m, 2) array of non-negative integers as `<prefix><source><separator><target><suffix>` lines.
+
+    The numbers are written as a matrix of ASCII digits, one row per edge, with the leading zeros replaced by NUL
+    bytes that are masked out when the matrix is flattened, so no Python-level formatting happens per edge.
+    """
+    if len(edges) == 0:
+        return b''
+    width = max(len(str(int(edges.max()))), 1)
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+
+    def digits(values: np.ndarray) -> np.ndarray:
+        matrix = (values[:, None] // powers) % 10 + ord('0')
+        # Keep at least the last digit so that 0 is written as '0'
+        matrix[values[:, None] < powers] = 0
+        matrix[:, -1] = values % 10 + ord('0')
+        return matrix.astype(np.uint8)
+
+    def constant(text: bytes) -> np.ndarray:
+        return np.broadcast_to(np.frombuffer(text, dtype=np.uint8), (len(edges), len(text)))
+
+    rows = np.hstack(
+        (constant(prefix), digits(edges[:, 0]), constant(separator), digits(edges[:, 1]), constant(suffix))
+    )
+    flat = rows.ravel()
+    return flat[flat != 0].tobytes()
+
+
+def write_edges(
+    edges: np.ndarray, file: BinaryIO, prefix: bytes, separator: bytes, suffix: bytes, chunk_size: int = 1 << 20
+) -> None:
+    """Writes an edge array with `encode_edges` in chunks of rows, bounding the memory of the digit matrix."""
+    for start in range(0, len(edges), chunk_size):
+        file.write(encode_edges(edges[start : start + chunk_size], prefix, separator, suffix))
+
+
+class EdgeStore:
+    """
+    Canonical on-disk copy of every generated graph, from which the input files of the systems are converted.
+
+    A graph is stored as `<base_dir>/canonical/<graph_type>/<size>/edges.npy`, an (m, 2) array of int32 (or int64
+    when the node ids need it) that can be memory-mapped, next to a small `meta.json` header.
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir) / 'canonical'
+
+    def directory(self, graph_type: str, size: int) -> Path:
+        return self.base_dir / graph_type / str(size)
+
+    def exists(self, graph_type: str, size: int) -> bool:
+        directory = self.directory(graph_type, size)
+        return (directory / 'edges.npy').exists() and (directory / 'meta.json').exists()
+
+    def save(self, graph_type: str, size: int, edges: np.ndarray, k: int) -> None:
+        """Saves an edge array with the smallest integer type that holds its node ids."""
+        dtype = np.int32 if len(edges) == 0 or edges.max() <= np.iinfo(np.int32).max else np.int64
+        directory = self.directory(graph_type, size)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / 'edges.npy', edges.astype(dtype, copy=False))
+        meta = {
+            'graphType': graph_type,
+            'size': size,
+            'k': k,
+            'numEdges': len(edges),
+            'dtype': np.dtype(dtype).name,
+        }
+        with open(directory / 'meta.json', 'w') as f:
+            json.dump(meta, f, indent=4)
+
+    def load(self, graph_type: str, size: int) -> np.ndarray:
+        """Returns the edge array of a graph, memory-mapped read-only so that it is not copied into memory."""
+        return np.load(self.directory(graph_type, size) / 'edges.npy', mmap_mode='r')
+
+    def meta(self, graph_type: str, size: int) -> dict[str, Any]:
+        with open(self.directory(graph_type, size) / 'meta.json') as f:
+            return json.load(f)
+
 
 class GraphGenerator:
     """
@@ -173,72 +387,227 @@ class GraphGenerator:
         """
         self.base_dir = Path(base_dir)
         self.config = config
+        self.edge_store = EdgeStore(self.base_dir)
 
-    def save_for_alda(self, graph_generator_func, size, filename: Path):
-        graph_generator = graph_generator_func(size)
-        data_set_of_tuples = set(graph_generator)
+    def input_format(self, env: str) -> Optional[str]:
+        """
+        Returns the input format an environment reads, which is also the name of its input directory: 'alda'
+        (pickled set of tuples), 'clingo_xsb' (`edge(a, b).` facts) or 'souffle' (TSV, also used by the DBs).
+        """
+        systems = self.config.get('defaults', {}).get('systems', {})
+        if env in ['clingo', 'xsb']:
+            return 'clingo_xsb'
+        if env in systems.get('dbSystems', []) + ['souffle']:
+            return 'souffle'
+        if env in systems.get('alda', []) + ['alda']:
+            return 'alda'
+        return None
+
+    def input_path(self, input_format: str, graph_type: str, size: int) -> Path:
+        """Returns the path of the input file of a graph in a given format."""
+        if input_format == 'souffle':
+            return self.base_dir / 'souffle' / graph_type / f'{size}' / 'edge.facts'
+        if input_format == 'clingo_xsb':
+            return self.base_dir / 'clingo_xsb' / graph_type / f'graph_{size}.lp'
+        return self.base_dir / input_format / graph_type / f'graph_{size}.pickle'
+
+    def save_for_alda(self, edges: np.ndarray, filename: Path):
+        data_set_of_tuples = set(zip(edges[:, 0].tolist(), edges[:, 1].tolist()))
         with open(filename, 'wb') as f:
             pickle.dump(data_set_of_tuples, f)
 
-    def save_for_souffle(self, graph_generator_func, size, filename: Path, fact_name: str = 'edge'):
-        graph_generator = graph_generator_func(size)
-        with open(filename, 'w') as file:
-            for value in graph_generator:
-                first, second = value
-                file.write(f'{first}\t{second}\n')
+    def save_for_souffle(self, edges: np.ndarray, filename: Path, fact_name: str = 'edge'):
+        with open(filename, 'wb') as file:
+            write_edges(edges, file, b'', b'\t', b'\n')
 
-    def save_for_clingo_xsb(self, graph_generator_func, size: int, filename: Path, fact_name: str = 'edge'):
-        graph_generator = graph_generator_func(size)
-        with open(filename, 'w') as file:
-            for value in graph_generator:
-                file.write(f'{fact_name}' + str(value) + '.\n')
+    def save_for_clingo_xsb(self, edges: np.ndarray, filename: Path, fact_name: str = 'edge'):
+        with open(filename, 'wb') as file:
+            write_edges(edges, file, f'{fact_name}('.encode(), b', ', b').\n')
 
-    def generate_and_save_graphs(self, graph_type: str, size: int):
-        data_gen = DataGenerator()
-        generate_graph_method = getattr(data_gen, f'generate_{graph_type}_graph', None)
+    def input_formats(self, environments: Optional[list[str]] = None) -> list[str]:
+        """
+        Returns the input formats read by the given environments, defaulting to all the environments with an
+        extension in the config.
+        """
+        if environments is None:
+            environments = list(self.config.get('defaults', {}).get('systems', {}).get('environmentExtensions', {}))
+        return [fmt for fmt in dict.fromkeys(self.input_format(env) for env in environments) if fmt is not None]
 
-        if generate_graph_method is None:
-            logging.error(f"Graph type '{graph_type}' is not supported or method is missing.")
-            return
+    def generate_and_save_graphs(self, graph_type: str, size: int, input_formats: list[str]) -> dict[str, Path]:
+        """
+        Generates a graph and converts it to the given input formats.
+
+        The graph is generated into the canonical edge store if 'canonical' is one of the formats or if it is not
+        there yet, otherwise the stored copy is memory-mapped and the other formats are streamed from it.
 
-        config = self.config['defaults']['systems']
+        Args:
+            `graph_type (str)`: The type of the graph.
+            `size (int)`: The size of the graph.
+            `input_formats (list[str])`: The formats to write, see `input_format`, and/or 'canonical'.
 
-        for env, ext in config.get('environmentExtensions', {}).items():
-            # Use a combined folder for 'clingo' and 'xsb'
-            if env in ['clingo', 'xsb']:
-                combined_env = 'clingo_xsb'
-                filename = self.base_dir / combined_env / graph_type / f'graph_{size}.lp'
-            elif env not in config.get('dbSystems', []) + ['souffle']:
-                filename = self.base_dir / env / graph_type / f'graph_{size}{ext}'
+        Returns:
+            `dict[str, Path]`: The file written for each format.
+        """
+        data_gen = DataGenerator()
+        generate_array_method = getattr(data_gen, f'generate_{graph_type}_array', None)
 
-            # Ensure the directory exists
+        if generate_array_method is None:
+            logging.error(f"Graph type '{graph_type}' is not supported or method is missing.")
+            return {}
+
+        written = {}
+        if 'canonical' in input_formats or not self.edge_store.exists(graph_type, size):
+            self.edge_store.save(graph_type, size, generate_array_method(size), data_gen.k)
+            written['canonical'] = self.edge_store.directory(graph_type, size) / 'edges.npy'
+        edges = self.edge_store.load(graph_type, size)
+
+        for input_format in input_formats:
+            if input_format == 'canonical':
+                continue
+            filename = self.input_path(input_format, graph_type, size)
             filename.parent.mkdir(parents=True, exist_ok=True)
+            logging.info(f'Converting {graph_type} graph of size {size} to {filename}')
+
+            if input_format == 'alda':
+                self.save_for_alda(edges, filename)
+            elif input_format == 'souffle':
+                self.save_for_souffle(edges, filename, fact_name='edge')
+            elif input_format == 'clingo_xsb':
+                self.save_for_clingo_xsb(edges, filename, fact_name='edge')
+            written[input_format] = filename
 
-            # Handling different environments
-            if env == 'alda':
-                self.save_for_alda(generate_graph_method, size, filename)
-            elif env in ['souffle']:
-                fact_name = 'edge'
-                filename = self.base_dir / env / graph_type / f'{size}' / f'{fact_name}.facts'
-                filename.parent.mkdir(parents=True, exist_ok=True)
-                self.save_for_souffle(generate_graph_method, size, filename, fact_name)
-            elif env in ['clingo', 'xsb']:
-                # For combined 'clingo' and 'xsb', we use the filename calculated with the combined_env
-                self.save_for_clingo_xsb(generate_graph_method, size, filename, fact_name='edge')
+        return written
 
-    def generate_graphs(self, size_ranges: list[int], graph_types: list[str]) -> None:
+    def missing_cells(
+        self, size_ranges: list[int], graph_types: list[str], environments: Optional[list[str]] = None
+    ) -> dict[tuple[str, int], list[str]]:
+        """
+        Returns the formats to (re)generate for every (graph_type, size) cell whose inputs are not current in the
+        manifest. Cells that are up to date are left out.
         """
-        Generates graphs of the specified types and sizes, and saves them in all supported formats.
+        manifest = InputManifest(self.base_dir)
+        k = DataGenerator().k
+        input_formats = ['canonical'] + self.input_formats(environments)
+        missing = {}
+        for graph_type in graph_types:
+            for size in size_ranges:
+                stale = [fmt for fmt in input_formats if not manifest.is_current(graph_type, size, k, fmt)]
+                if stale:
+                    missing[(graph_type, size)] = stale
+        return missing
+
+    def generate_graphs(
+        self,
+        size_ranges: list[int],
+        graph_types: list[str],
+        environments: Optional[list[str]] = None,
+        force: bool = False,
+        jobs: Optional[int] = None,
+    ) -> None:
+        """
+        Generates the graphs of the specified types and sizes whose inputs are missing or stale in the manifest,
+        in the formats the environments need. Every (graph_type, size) cell is generated in its own process of a
+        pool and recorded in the manifest as soon as it is done.
 
         Args:
             `size_ranges (list)`: The sizes of the graphs to be generated.
             `graph_types (list)`: The types of the graphs to be generated.
+            `environments (Optional[list[str]])`: The environments to produce input files for. Defaults to all.
+            `force (bool)`: Regenerate the graphs and input files even if they are current.
+            `jobs (Optional[int])`: The number of processes generating cells. Defaults to the number of CPUs.
         """
-        for size in size_ranges:
-            logging.info(f'Generating graphs for size {size}.')
-            for graph_type in graph_types:
-                logging.info(f'Generating graphs for type {graph_type} of size {size}.')
-                self.generate_and_save_graphs(graph_type, size)
+        if force:
+            input_formats = ['canonical'] + self.input_formats(environments)
+            cells = {(graph_type, size): input_formats for graph_type in graph_types for size in size_ranges}
+        else:
+            cells = self.missing_cells(size_ranges, graph_types, environments)
+
+        if not cells:
+            logging.info(f'All inputs up to date for {graph_types} and sizes {size_ranges}.')
+            return
+
+        manifest = InputManifest(self.base_dir)
+        k = DataGenerator().k
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(generate_cell, self.base_dir, self.config, graph_type, size, input_formats): (
+                    graph_type,
+                    size,
+                )
+                for (graph_type, size), input_formats in cells.items()
+            }
+            for future in as_completed(futures):
+                graph_type, size = futures[future]
+                try:
+                    for input_format, entry in future.result().items():
+                        manifest.record(graph_type, size, k, input_format, entry)
+                except Exception as e:
+                    logging.error(f'Failed to generate {graph_type} graph of size {size}: {e}')
+                    continue
+                manifest.save()
+                logging.info(f'Generated {graph_type} graph of size {size}.')
+
+
+class InputManifest:
+    """
+    Index of the generated input files, stored as `<base_dir>/manifest.json`.
+
+    Every file is keyed by the graph type, size, generator `k`, `GENERATOR_VERSION` and format it was generated
+    with, and recorded with its path, size and SHA-256 hash. An input is current only if its key is in the manifest
+    and the file on disk still has the recorded size (and hash, when verifying).
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self.path = self.base_dir / 'manifest.json'
+        self.entries: dict[str, dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f'Ignoring unreadable input manifest {self.path}: {e}')
+
+    @staticmethod
+    def key(graph_type: str, size: int, k: int, input_format: str) -> str:
+        return f'{graph_type}/{size}/k{k}/v{GENERATOR_VERSION}/{input_format}'
+
+    @staticmethod
+    def file_entry(path: Path) -> dict[str, Any]:
+        """Returns the manifest entry of a file: its path, size in bytes and SHA-256 hash."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return {'path': str(path), 'bytes': path.stat().st_size, 'sha256': digest.hexdigest()}
+
+    def is_current(self, graph_type: str, size: int, k: int, input_format: str, verify: bool = False) -> bool:
+        entry = self.entries.get(self.key(graph_type, size, k, input_format))
+        if entry is None:
+            return False
+        path = Path(entry['path'])
+        if not path.exists() or path.stat().st_size != entry['bytes']:
+            return False
+        return not verify or self.file_entry(path)['sha256'] == entry['sha256']
+
+    def record(self, graph_type: str, size: int, k: int, input_format: str, entry: dict[str, Any]) -> None:
+        self.entries[self.key(graph_type, size, k, input_format)] = entry
+
+    def save(self) -> None:
+        """Writes the manifest atomically, so that an interrupted run never leaves it half written."""
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def generate_cell(
+    base_dir: Path, config: dict[str, Any], graph_type: str, size: int, input_formats: list[str]
+) -> dict[str, dict[str, Any]]:
+    """Generates one (graph_type, size) cell in a pool process and returns the manifest entries of its files."""
+    written = GraphGenerator(base_dir, config).generate_and_save_graphs(graph_type, size, input_formats)
+    return {input_format: InputManifest.file_entry(path) for input_format, path in written.items()}
 
 
 def main():
@@ -274,6 +643,21 @@ def main():
         ],
         help='The types of graphs to run the experiment on. Default is complete cycle cycle_with_shortcuts star max_acyclic path multi_path binary_tree reverse_binary_tree w y x.',
     )
+    parser.add_argument(
+        '--environments',
+        nargs='+',
+        help='Only produce the input files these environments need. Default is all the environments in the config.',
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Regenerate the graphs and their input files even if they are current in the manifest.',
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        help='The number of processes generating graphs in parallel. Default is the number of CPUs.',
+    )
     args = parser.parse_args()
 
     if args.config and os.path.isfile(args.config):
@@ -285,7 +669,7 @@ def main():
 
     logging.info(f'Generating graphs for sizes {args.sizes} and types {args.graph_types}.')
     generator = GraphGenerator('input', config)
-    generator.generate_graphs(list(range(*args.sizes)), args.graph_types)
+    generator.generate_graphs(list(range(*args.sizes)), args.graph_types, args.environments, args.force, args.jobs)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
 import argparse
+import csv
 import json
 import logging
 import math
@@ -17,6 +18,7 @@ class BaseTableAndPlotGenerator:
         self.pattern = pattern
         self.latex_file_dir = latex_file_dir
         self.data = None
+        self.memory_data = None
         self.components = self.__initialize_components()
         self.component_colors = self.__initialize_component_colors()
         self.component_legend = self.__initialize_component_legends()
@@ -187,6 +189,7 @@ class BaseTableAndPlotGenerator:
 
     def collect_data(self) -> None:
         data = {}
+        memory_data = {}
         for csv_file in self.timing_base_dir.glob('**/*_graph_*.csv'):
             try:
                 parts = csv_file.parts
@@ -223,9 +226,69 @@ class BaseTableAndPlotGenerator:
                         data[key].append((graph_size, self.__process_neo4j_data(last_line)))
                     elif env_name == 'alda':
                         data[key].append((graph_size, self.__process_alda_data(last_line)))
+
+                    headers = lines[0].strip().split(',')
+                    if data[key] and data[key][-1][0] == graph_size:
+                        self.__add_server_cpu_time(data[key][-1][1], headers, last_line)
+
+                    peak_memory = self.__peak_memory(headers, last_line)
+                    if peak_memory is not None:
+                        memory_data.setdefault(key, []).append((graph_size, peak_memory))
             except Exception as e:
                 logging.error(f"Error processing file {csv_file}: {e}")
         self.data = data
+        self.memory_data = memory_data
+
+    @staticmethod
+    def __peak_memory(headers: list[str], last_line: list[str]) -> Union[float, None]:
+        """
+        Returns the peak memory of a run in MiB from its `<Phase>PeakRSS` columns, adding the peak of the server
+        (`<Phase>ServerPeakRSS`) for server-backed systems, or None if the run has no memory columns.
+        """
+        values = last_line[1:] if last_line and last_line[0] == 'Average' else last_line
+        client_peak, server_peak, found = 0.0, 0.0, False
+        for header, value in zip(headers, values):
+            if not header.endswith('PeakRSS'):
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                continue
+            found = True
+            if header.endswith('ServerPeakRSS'):
+                server_peak = max(server_peak, value)
+            else:
+                client_peak = max(client_peak, value)
+        return (client_peak + server_peak) / 2**20 if found else None
+
+    @staticmethod
+    def __add_server_cpu_time(
+        components: dict[str, tuple[float, float]], headers: list[str], last_line: list[str]
+    ) -> None:
+        """
+        Adds the `<Phase>ServerCPUTime` columns of DB runs, if any, to the CPU time of the matching components, so that
+        the CPU time of server-backed systems is not only the (near zero) client CPU time.
+        """
+        # The average row starts with an 'Average' label that the header row does not have
+        values = last_line[1:] if last_line and last_line[0] == 'Average' else last_line
+        server_cpu = {}
+        for header, value in zip(headers, values):
+            if header.endswith('ServerCPUTime'):
+                try:
+                    server_cpu[header.removesuffix('ServerCPUTime')] = float(value)
+                except ValueError:
+                    continue
+        if not server_cpu:
+            return
+
+        phases_by_component = {
+            'WriteRes': ['WriteResult'],
+            'CreateIndex': ['CreateIndex', 'CreateIndexX', 'CreateIndexY'],
+            'ExecuteQuery': ['ExecuteQuery', 'Query'],
+        }
+        for component, (real_time, cpu_time) in components.items():
+            phases = phases_by_component.get(component, [component])
+            components[component] = (real_time, cpu_time + sum(server_cpu.get(phase, 0.0) for phase in phases))
 
     @staticmethod
     def __process_clingo_data(last_line: list[str]) -> dict[str, tuple[float, float]]:
@@ -982,6 +1045,131 @@ class TableAndPlotGenerator(BaseTableAndPlotGenerator):
 
                 self._BaseTableAndPlotGenerator__compile_latex_to_pdf(mode_dir)
 
+    def __generate_latex_memory_charts(self, latex_file_dir: Path, compile_file_alone: bool) -> None:
+        """
+        Generates one line chart per graph type and mode with the peak memory of every environment versus the graph
+        size, next to the time charts in `comparison/memory`.
+        """
+        file_dir = latex_file_dir / 'comparison' / 'memory'
+        if compile_file_alone:
+            self._BaseTableAndPlotGenerator__compile_latex_to_pdf(file_dir)
+            return
+        file_dir.mkdir(exist_ok=True, parents=True)
+
+        charts: dict[tuple[str, str], dict[str, list[tuple[int, float]]]] = {}
+        for (env_name, graph_type, mode), values in self.memory_data.items():
+            if self.environments and env_name not in self.environments:
+                continue
+            points = sorted(value for value in values if self.max_x <= 0 or value[0] <= self.max_x)
+            charts.setdefault((graph_type, mode), {})[env_name] = points
+
+        for (graph_type, mode), envs in charts.items():
+            full_file_name = file_dir / f'{graph_type}_{mode}.tex'
+            with open(full_file_name, 'w') as f:
+                self._BaseTableAndPlotGenerator__write_latex_header(f)
+                f.write('\\begin{tikzpicture}\n')
+                f.write('\\begin{axis}[\n')
+                f.write(
+                    f'   title={{Peak memory for {self.graph_name_mappings.get(graph_type, graph_type)}, {mode.replace("_", " ")}}},\n'
+                )
+                f.write('   width=1.5\\textwidth,\n')
+                f.write('   ymin=0,\n')
+                f.write('   ymajorgrids, tick align=inside,\n')
+                f.write('   major grid style={draw=gray!20},\n')
+                f.write('   legend pos=north west,\n')
+                f.write('   ylabel={Peak memory (MiB)},\n')
+                f.write(f'   xlabel={{{self._BaseTableAndPlotGenerator__get_xlabel_for_graph_type(graph_type)}}},\n')
+                f.write('   label style={font=\\Huge},\n')
+                f.write('   tick label style={font=\\Huge},\n')
+                f.write('   legend style={font=\\Huge},\n')
+                f.write(']\n')
+                for env_name, points in sorted(envs.items()):
+                    f.write('\\addplot +[mark=*, line width=1pt] coordinates {\n')
+                    for size, peak_memory in points:
+                        f.write(f'    ({size}, {peak_memory:.2f})\n')
+                    f.write('};\n')
+                    f.write(f'\\addlegendentry{{{env_name}}}\n')
+                f.write('\\end{axis}\n')
+                f.write('\\end{tikzpicture}\n')
+                self._BaseTableAndPlotGenerator__write_latex_footer(f)
+
+            self._BaseTableAndPlotGenerator__format_latex_file(full_file_name)
+
+        self._BaseTableAndPlotGenerator__compile_latex_to_pdf(file_dir)
+
+    def __collect_sweep_data(self) -> dict[tuple[str, str], dict[tuple[int, str], dict[int, float]]]:
+        """
+        Reads the DuckDB sweep files and returns, per graph type and mode, the average `ExecuteQueryRealTime` of
+        every (size, memory limit) line at every thread count.
+        """
+        sums: dict[tuple[str, str, int, str, int], list[float]] = {}
+        for csv_file in (self.timing_base_dir / 'duckdb').glob('*/sweep_*_size_*.csv'):
+            match = re.match(r'^sweep_(.*?)_size_(\d+)\.csv$', csv_file.name)
+            if not match:
+                continue
+            mode, size = match.group(1), int(match.group(2))
+            if mode in getattr(self, 'exclude_modes', ['double_recursion']):
+                continue
+            with csv_file.open('r', newline='') as file:
+                for row in csv.DictReader(file):
+                    try:
+                        key = (csv_file.parent.name, mode, size, row['MemoryLimit'], int(row['Threads']))
+                        sums.setdefault(key, []).append(float(row['ExecuteQueryRealTime']))
+                    except (KeyError, ValueError) as e:
+                        logging.error(f'Skipping sweep row of {csv_file}: {e}')
+
+        sweep_data: dict[tuple[str, str], dict[tuple[int, str], dict[int, float]]] = {}
+        for (graph_type, mode, size, memory_limit, threads), times in sums.items():
+            line = sweep_data.setdefault((graph_type, mode), {}).setdefault((size, memory_limit), {})
+            line[threads] = sum(times) / len(times)
+        return sweep_data
+
+    def __generate_latex_speedup_charts(self, latex_file_dir: Path, compile_file_alone: bool) -> None:
+        """
+        Generates one line chart per graph type and mode with the speedup of the DuckDB recursive query versus the
+        number of threads, relative to the smallest thread count, with a line per graph size and memory limit.
+        """
+        file_dir = latex_file_dir / 'comparison' / 'speedup'
+        if compile_file_alone:
+            self._BaseTableAndPlotGenerator__compile_latex_to_pdf(file_dir)
+            return
+        file_dir.mkdir(exist_ok=True, parents=True)
+
+        for (graph_type, mode), lines in self.__collect_sweep_data().items():
+            full_file_name = file_dir / f'{graph_type}_{mode}.tex'
+            with open(full_file_name, 'w') as f:
+                self._BaseTableAndPlotGenerator__write_latex_header(f)
+                f.write('\\begin{tikzpicture}\n')
+                f.write('\\begin{axis}[\n')
+                f.write(
+                    f'   title={{DuckDB speedup for {self.graph_name_mappings.get(graph_type, graph_type)}, {mode.replace("_", " ")}}},\n'
+                )
+                f.write('   width=1.5\\textwidth,\n')
+                f.write('   ymin=0,\n')
+                f.write('   ymajorgrids, tick align=inside,\n')
+                f.write('   major grid style={draw=gray!20},\n')
+                f.write('   legend pos=north west,\n')
+                f.write('   ylabel={Speedup},\n')
+                f.write('   xlabel={Threads},\n')
+                f.write('   label style={font=\\Huge},\n')
+                f.write('   tick label style={font=\\Huge},\n')
+                f.write('   legend style={font=\\Huge},\n')
+                f.write(']\n')
+                for (size, memory_limit), times in sorted(lines.items()):
+                    baseline = times[min(times)]
+                    f.write('\\addplot +[mark=*, line width=1pt] coordinates {\n')
+                    for threads, time in sorted(times.items()):
+                        f.write(f'    ({threads}, {baseline / time if time > 0 else 0:.3f})\n')
+                    f.write('};\n')
+                    f.write(f'\\addlegendentry{{{size} ({memory_limit})}}\n')
+                f.write('\\end{axis}\n')
+                f.write('\\end{tikzpicture}\n')
+                self._BaseTableAndPlotGenerator__write_latex_footer(f)
+
+            self._BaseTableAndPlotGenerator__format_latex_file(full_file_name)
+
+        self._BaseTableAndPlotGenerator__compile_latex_to_pdf(file_dir)
+
     def generate_plot_table(self, compile_file_alone: bool) -> None:
         """
         This function generates plot tables for the timing data.
@@ -1003,6 +1191,10 @@ class TableAndPlotGenerator(BaseTableAndPlotGenerator):
                 self.__generate_latex_comparison_charts(self.latex_file_dir, env_name, compile_file_alone)
         # self.__generate_latex_comparison_tables(self.latex_file_dir)
         self.__combine_files_for_comparison(self.latex_file_dir / 'comparison' / 'charts', compile_file_alone)
+        if getattr(self, 'memory_charts', False):
+            self.__generate_latex_memory_charts(self.latex_file_dir, compile_file_alone)
+        if getattr(self, 'speedup_charts', False):
+            self.__generate_latex_speedup_charts(self.latex_file_dir, compile_file_alone)
 
 
 def main():
@@ -1049,6 +1241,16 @@ def main():
         default=[],
         help='Modes to exclude from processing',
     )
+    parser.add_argument(
+        '--memory-charts',
+        action='store_true',
+        help='Also plot the peak memory of every environment versus the graph size',
+    )
+    parser.add_argument(
+        '--speedup-charts',
+        action='store_true',
+        help='Also plot the speedup of DuckDB versus the number of threads from its sweep runs',
+    )
     args = parser.parse_args()
 
     if args.config and os.path.isfile(args.config):
@@ -1073,6 +1275,8 @@ def main():
         args.max_x_axis,
     )
     table_plot_generator.exclude_modes = args.exclude_modes  # Add this attribute
+    table_plot_generator.memory_charts = args.memory_charts
+    table_plot_generator.speedup_charts = args.speedup_charts
     table_plot_generator.generate_plot_table(args.compile_latex)
 
 
@@ -1,6 +1,8 @@
+import csv
 from typing import Any
 
 import MySQLdb
+import MySQLdb.cursors
 
 from common import Base
 
@@ -11,9 +13,10 @@ class MariaDBOperations(Base):
         self.conn = conn
         self.conn.autocommit(True)
 
-    def execute_query(self, query: str, params: Any = None) -> None:
+    def execute_query(self, query: str, params: Any = None) -> int:
         cursor: MySQLdb.cursors.BaseCursor = self.conn.cursor()
         cursor.execute(query, params)
+        return cursor.rowcount
 
     def import_data_from_file(
         self, table_name: str, file_path: str, delimiter: str = '\t'
@@ -31,6 +34,21 @@ class MariaDBOperations(Base):
         outfile_query = f"SELECT * FROM tc_result INTO OUTFILE '/tmp/mariadb_results.csv' FIELDS TERMINATED BY '{delimiter}' LINES TERMINATED BY '\n';"
         self.execute_query(outfile_query)
 
+    def stream_data_to_file(self, file_path: str, fetch_size: int = 10000, delimiter: str = ',') -> None:
+        """
+        Streams the result rows to a file on the client through a server-side cursor, `fetch_size` rows at a time,
+        so that memory stays flat however large the closure is and no file is written on the server.
+        """
+        cursor = self.conn.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            cursor.execute('SELECT * FROM tc_result')
+            with open(file_path, 'w', newline='', buffering=1 << 20) as f:
+                writer = csv.writer(f, delimiter=delimiter, lineterminator='\n')
+                while rows := cursor.fetchmany(fetch_size):
+                    writer.writerows(rows)
+        finally:
+            cursor.close()
+
     def create_tc_path_table(self) -> None:
         self.execute_query(
             """
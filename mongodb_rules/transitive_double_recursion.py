@@ -1,37 +1,18 @@
+from typing import Any
+
 from mongodb_rules import MongoDBOperations
 
 
 class MongoDBDoubleRecursion(MongoDBOperations):
-    def recursive_query(self, input_collection, output_collection):
-        self.db[input_collection].aggregate(
-            [
-                {
-                    '$graphLookup': {
-                        'from': input_collection,
-                        'startWith': '$x',
-                        'connectFromField': 'y',
-                        'connectToField': 'x',
-                        'as': 'paths',
-                        'restrictSearchWithMatch': {},
-                    }
-                },
-                {'$unwind': '$paths'},
-                {
-                    '$project': {
-                        '_id': 0,
-                        'x': '$x',
-                        'y': '$paths.y',
-                    }
-                },
-                {
-                    '$group': {
-                        '_id': {'x': '$x', 'y': '$y'},
-                        'x': {'$first': '$x'},
-                        'y': {'$first': '$y'},
-                    }
-                },
-                {'$project': {'_id': 0, 'x': 1, 'y': 1}},
-                {'$out': output_collection},
-            ],
-            allowDiskUse=True,
-        )
+    def delta_pipeline(self, input_collection: str, output_collection: str) -> list[dict[str, Any]]:
+        """
+        tc(X, Y) :- tc(X, Z), tc(Z, Y): the delta is joined with the closure found so far on both sides.
+        """
+        return self.join_stages(output_collection, 'y', 'x', '$x', '$j.y') + [
+            {
+                '$unionWith': {
+                    'coll': self.delta_collection,
+                    'pipeline': self.join_stages(output_collection, 'x', 'y', '$j.x', '$y'),
+                }
+            }
+        ]
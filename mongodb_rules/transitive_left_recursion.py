@@ -1,37 +1,11 @@
+from typing import Any
+
 from mongodb_rules import MongoDBOperations
 
 
 class MongoDBLeftRecursion(MongoDBOperations):
-    def recursive_query(self, input_collection, output_collection):
-        self.db[input_collection].aggregate(
-            [
-                {
-                    '$graphLookup': {
-                        'from': input_collection,
-                        'startWith': '$x',
-                        'connectFromField': 'y',
-                        'connectToField': 'x',
-                        'as': 'paths',
-                        'restrictSearchWithMatch': {},
-                    }
-                },
-                {'$unwind': '$paths'},
-                {
-                    '$project': {
-                        '_id': 0,
-                        'x': '$x',
-                        'y': '$paths.y',
-                    }
-                },
-                {
-                    '$group': {
-                        '_id': {'x': '$x', 'y': '$y'},
-                        'x': {'$first': '$x'},
-                        'y': {'$first': '$y'},
-                    }
-                },
-                {'$project': {'_id': 0, 'x': 1, 'y': 1}},
-                {'$out': output_collection},
-            ],
-            allowDiskUse=True,
-        )
+    def delta_pipeline(self, input_collection: str, output_collection: str) -> list[dict[str, Any]]:
+        """
+        tc(X, Y) :- tc(X, Z), edge(Z, Y): the delta is extended by one edge at its end.
+        """
+        return self.join_stages(input_collection, 'y', 'x', '$x', '$j.y')
@@ -0,0 +1,164 @@
+import csv
+import logging
+from time import perf_counter
+from typing import Any, Optional
+
+import numpy as np
+
+from common import Base
+
+
+class Neo4jBulkLoader(Base):
+    """
+    Loads the edge facts into Neo4J from Python, with the uniqueness constraint on `Node.id` created before the load.
+
+    `LOAD CSV` with `MERGE` looks up every endpoint before the index on `Node.id` exists, which makes the load
+    quadratic in the number of nodes. Here the distinct nodes are created first and the relationships are then sent
+    in `UNWIND $rows` batches, each endpoint being found through the constraint's index.
+    """
+
+    def __init__(self, config: dict[str, Any], session: Any, batch_size: int = 10000) -> None:
+        """
+        Initializes the Neo4jBulkLoader class with the given configuration and Neo4J session.
+
+        Args:
+            config (dict[str, Any]): Configuration dictionary.
+            session (Any): An open Neo4J session.
+            batch_size (int, optional): The number of nodes or relationships sent per query. Defaults to 10000.
+        """
+        super().__init__(config)
+        self.session = session
+        self.batch_size = batch_size
+        self.batches = 0
+
+    @staticmethod
+    def read_edges(file_path: str) -> np.ndarray:
+        """
+        Reads a whitespace separated edge file into an (m, 2) array.
+
+        Args:
+            file_path (str): The path to the edge facts file.
+        """
+        return np.fromfile(file_path, dtype=np.int64, sep=' ').reshape(-1, 2)
+
+    def drop_node_indexes(self) -> None:
+        """
+        Drops the range indexes on `Node.id` left by the `LOAD CSV` scripts, since Neo4J rejects a uniqueness
+        constraint on the same schema as an existing index. Besides `node_id_index`, this drops any index on
+        `Node.id` that is not backed by a constraint, such as the unnamed one of earlier versions of the scripts.
+        """
+        self.session.run('DROP INDEX node_id_index IF EXISTS').consume()
+        result = self.session.run(
+            """
+            SHOW INDEXES YIELD name, labelsOrTypes, properties, owningConstraint
+            WHERE labelsOrTypes = ['Node'] AND properties = ['id'] AND owningConstraint IS NULL
+            RETURN name
+            """
+        )
+        for name in [record['name'] for record in result]:
+            self.session.run(f'DROP INDEX `{name}` IF EXISTS').consume()
+
+    def create_node_constraint(self) -> None:
+        """
+        Creates the uniqueness constraint on `Node.id`, which also creates the index used to match the endpoints,
+        after dropping the indexes on `Node.id` that would conflict with it.
+        """
+        self.drop_node_indexes()
+        self.session.run('CREATE CONSTRAINT node_id IF NOT EXISTS FOR (n:Node) REQUIRE n.id IS UNIQUE').consume()
+
+    def drop_node_constraint(self) -> None:
+        """
+        Drops the uniqueness constraint so that the `LOAD CSV` scripts can create their own index.
+        """
+        self.session.run('DROP CONSTRAINT node_id IF EXISTS').consume()
+
+    def run_batches(self, query: str, rows: np.ndarray) -> None:
+        """
+        Runs a query once per batch of rows, passing the batch as the `$rows` parameter.
+
+        Args:
+            query (str): The Cypher query, which should `UNWIND $rows`.
+            rows (np.ndarray): The rows to send.
+        """
+        for start in range(0, len(rows), self.batch_size):
+            self.session.run(query, rows=rows[start : start + self.batch_size].tolist()).consume()
+            self.batches += 1
+
+    def load_data(self, file_path: str) -> None:
+        """
+        Creates a node per distinct id of the edge file, then a relationship per edge.
+
+        Args:
+            file_path (str): The path to the edge facts file.
+        """
+        edges = self.read_edges(file_path)
+        self.batches = 0
+        self.run_batches('UNWIND $rows AS id CREATE (:Node {id: id})', np.unique(edges))
+        self.run_batches(
+            """
+            UNWIND $rows AS row
+            MATCH (a:Node {id: row[0]})
+            MATCH (b:Node {id: row[1]})
+            CREATE (a)-[:EDGE]->(b)
+            """,
+            edges,
+        )
+        logging.info(f'Loaded {len(edges)} edges into Neo4J in {self.batches} batches of up to {self.batch_size}')
+
+    def counts(self) -> dict[str, Any]:
+        """Returns the batch size and the number of batches of the load, written next to the timings."""
+        return {'LoadBatchSize': self.batch_size, 'LoadBatches': self.batches}
+
+
+class Neo4jResultStream:
+    """
+    Runs the transitive closure query once and writes its result to CSV from the client, instead of running the same
+    traversal a second time inside `apoc.export.csv.query` and copying the file out of the import directory.
+    """
+
+    def __init__(self, session: Any) -> None:
+        """
+        Initializes the Neo4jResultStream class with the given Neo4J session.
+
+        Args:
+            session (Any): An open Neo4J session.
+        """
+        self.session = session
+        self.keys: list[str] = []
+        self.rows: list[tuple] = []
+        self.first_record_time: Optional[float] = None
+
+    def run_query(self, query: str) -> None:
+        """
+        Runs a query and consumes its whole result, recording the latency of the first record.
+
+        Args:
+            query (str): The Cypher query.
+        """
+        start = perf_counter()
+        result = self.session.run(query)
+        self.keys = list(result.keys())
+        self.rows = []
+        self.first_record_time = None
+        for record in result:
+            if self.first_record_time is None:
+                self.first_record_time = perf_counter() - start
+            self.rows.append(tuple(record.values()))
+
+    def write_csv(self, file_path: str, buffer_size: int = 1 << 20) -> None:
+        """
+        Writes the consumed result to a CSV file with a header of the result's keys.
+
+        Args:
+            file_path (str): The path to the CSV file.
+            buffer_size (int, optional): The size of the write buffer in bytes. Defaults to 1 MiB.
+        """
+        with open(file_path, 'w', newline='', buffering=buffer_size) as f:
+            writer = csv.writer(f)
+            writer.writerow(self.keys)
+            writer.writerows(self.rows)
+        logging.info(f'Wrote {len(self.rows)} rows to {file_path}')
+
+    def counts(self) -> dict[str, Any]:
+        """Returns the first-record latency and the number of result rows, written next to the timings."""
+        return {'QueryFirstRecordTime': self.first_record_time, 'ResultRows': len(self.rows)}
@@ -5,7 +5,7 @@ MERGE (a:Node {id: toInteger(line[0])})
 MERGE (b:Node {id: toInteger(trim(line[1]))})
 CREATE (a)-[:EDGE]->(b);
 
-CREATE INDEX IF NOT EXISTS FOR (n:Node) ON (n.id);
+CREATE INDEX node_id_index IF NOT EXISTS FOR (n:Node) ON (n.id);
 
 MATCH (start:Node)-[:EDGE*1..]->(end:Node) 
 RETURN DISTINCT start.id AS x, end.id AS y;
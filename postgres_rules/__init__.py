@@ -1,11 +1,58 @@
-from typing import Any
+from typing import Any, Optional
 
+import numpy as np
 from psycopg2 import extensions, sql
 
 from common import Base
 
+# Header of the binary COPY format: signature, flags and header extension length
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\0' + (0).to_bytes(4, 'big') + (0).to_bytes(4, 'big')
+PGCOPY_TRAILER = (-1).to_bytes(2, 'big', signed=True)
+# A tuple of two INTEGER fields: field count, then length and value of each field, in network byte order
+PGCOPY_EDGE_DTYPE = np.dtype([('fields', '>i2'), ('x_length', '>i4'), ('x', '>i4'), ('y_length', '>i4'), ('y', '>i4')])
+
+
+class BinaryCopyReader:
+    """
+    File-like object that encodes an edge array to the binary COPY format chunk by chunk as psycopg2 reads it, so
+    the whole payload is never held in memory.
+    """
+
+    def __init__(self, edges: np.ndarray, chunk_rows: int = 1 << 16) -> None:
+        self.edges = edges
+        self.chunk_rows = chunk_rows
+        self.next_row = 0
+        self.buffer = PGCOPY_HEADER
+        self.finished = False
+
+    def encode_chunk(self) -> bytes:
+        chunk = self.edges[self.next_row : self.next_row + self.chunk_rows]
+        self.next_row += len(chunk)
+        tuples = np.empty(len(chunk), dtype=PGCOPY_EDGE_DTYPE)
+        tuples['fields'] = 2
+        tuples['x_length'] = 4
+        tuples['y_length'] = 4
+        tuples['x'] = chunk[:, 0]
+        tuples['y'] = chunk[:, 1]
+        return tuples.tobytes()
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            if self.next_row < len(self.edges):
+                self.buffer += self.encode_chunk()
+            else:
+                self.buffer += PGCOPY_TRAILER
+                self.finished = True
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
 
 class PostgresOperations(Base):
+    # Keyword of each storage profile to put between CREATE and TABLE
+    storage_profiles = {'logged': '', 'unlogged': 'UNLOGGED ', 'temp': 'TEMPORARY '}
+
     def __init__(self, config: dict[str, Any], conn: extensions.connection) -> None:
         """
         Initializes the PostgresOperations class with the given configuration and database connection.
@@ -17,17 +64,32 @@ class PostgresOperations(Base):
         super().__init__(config)
         self.conn = conn
         self.conn.set_session(autocommit=True)
+        # 'logged' tables are written to the WAL, 'unlogged' ones are not, 'temp' ones are also private to the session
+        self.storage_profile = config.get('postgres', {}).get('storageProfile', 'logged')
+        if self.storage_profile not in self.storage_profiles:
+            raise ValueError(
+                f"Unsupported storage profile '{self.storage_profile}', expected one of {list(self.storage_profiles)}"
+            )
+
+    @property
+    def table_kind(self) -> str:
+        """The keyword of the storage profile to put between CREATE and TABLE."""
+        return self.storage_profiles[self.storage_profile]
 
-    def execute_query(self, query: str, params: Any = None) -> None:
+    def execute_query(self, query: str, params: Any = None) -> int:
         """
         Executes a SQL query.
 
         Args:
             query (str): The SQL query to execute.
             params (Any, optional): Parameters to pass to the query. Defaults to None.
+
+        Returns:
+            int: The number of rows affected by the query.
         """
         cursor = self.conn.cursor()
         cursor.execute(query, params)
+        return cursor.rowcount
 
     def import_data_from_tsv(self, table_name: str, file_path: str) -> None:
         """
@@ -46,6 +108,22 @@ class PostgresOperations(Base):
                     f,
                 )
 
+    def import_data_from_array(self, table_name: str, edges: np.ndarray, chunk_rows: Optional[int] = None) -> None:
+        """
+        Imports an edge array into a specified table with a binary COPY encoded on the client, so that the server
+        does not parse any text.
+
+        Args:
+            table_name (str): The name of the table to import data into.
+            edges (np.ndarray): An (m, 2) array of edges.
+            chunk_rows (int, optional): The number of edges encoded at a time. Defaults to 65536.
+        """
+        with self.conn.cursor() as cursor:
+            cursor.copy_expert(
+                sql.SQL('COPY {} (x, y) FROM STDIN WITH (FORMAT binary)').format(sql.Identifier(table_name)),
+                BinaryCopyReader(edges, chunk_rows or 1 << 16),
+            )
+
     def export_data_to_csv(self, query: str, file_path: str) -> None:
         """
         Exports data from a SQL query to a CSV file.
@@ -77,8 +155,8 @@ class PostgresOperations(Base):
         Creates a temporary table for storing path data with columns x and y.
         """
         self.execute_query(
-            """
-        CREATE TABLE edge(
+            f"""
+        CREATE {self.table_kind}TABLE edge(
             x INTEGER NOT NULL,
             y INTEGER NOT NULL
         );
@@ -7,8 +7,8 @@ class PostgreSQLLeftRecursion(PostgresOperations):
         Runs the right recursion query for transitive closure.
         """
         self.execute_query(
-            """
-        CREATE TABLE tc_result AS
+            f"""
+        CREATE {self.table_kind}TABLE tc_result AS
         WITH RECURSIVE tc AS (
             SELECT x, y FROM edge
             UNION
@@ -19,11 +19,13 @@ int main(int argc, char *argv[])
 
     if (argc < 2)
     {
-        std::cerr << "Usage: " << argv[0] << " <facts_folder>" << std::endl;
+        std::cerr << "Usage: " << argv[0] << " <facts_folder> [output_folder]" << std::endl;
         return 1;
     }
 
     const std::string factsFolder = argv[1];
+    // The output folder is taken at run time so that a compiled binary can be reused across inputs
+    const std::string outputFolder = argc > 2 ? argv[2] : "";
     std::cout << "Facts folder: " << factsFolder << std::endl;
 
     // Initialize Souffle program
@@ -59,7 +61,7 @@ int main(int argc, char *argv[])
     long double startUserPrint, startSysPrint, endUserPrint, endSysPrint;
     auto start_print = high_resolution_clock::now();
     getCPUTimes(startUserPrint, startSysPrint);
-    prog->printAll();
+    prog->printAll(outputFolder);
     getCPUTimes(endUserPrint, endSysPrint);
     auto end_print = high_resolution_clock::now();
 
@@ -1,6 +1,12 @@
+import sqlite3
+import subprocess
+import sys
+import tempfile
 from pathlib import Path
+from unittest import skipUnless
 from unittest.mock import MagicMock, patch
 
+import common
 from common import AnalyzeSystems, Base
 from tests import BaseTest
 
@@ -105,6 +111,87 @@ class TestCommon(BaseTest):
             local_infile=1,
         )
 
+    def test_connect_db_dispatches_to_plugin(self):
+        with patch.object(Base, '_connect_psycopg2', return_value='conn') as mock_connect:
+            result = self.base.connect_db('CockroachDB')
+        self.assertEqual(result, 'conn')
+        mock_connect.assert_called_once_with('cockroachdb', None)
+
+    def test_connect_db_unsupported(self):
+        with self.assertRaises(ValueError):
+            self.base.connect_db('sqlite')
+
+    @patch('importlib.import_module')
+    def test_import_driver_records_time_once(self, mock_import):
+        mock_import.return_value = MagicMock()
+        with patch.dict(common.DRIVER_IMPORT_TIMES, clear=True):
+            common.import_driver('fake_driver')
+            common.import_driver('fake_driver')
+            self.assertEqual(list(common.DRIVER_IMPORT_TIMES), ['fake_driver'])
+            self.assertIn('fake_driver', common.import_time_report())
+        self.assertEqual(mock_import.call_count, 2)
+
+    def test_format_and_parse_cpu_set(self):
+        cpus = {0, 1, 2, 3, 8, 10, 11}
+        self.assertEqual(common.format_cpu_set(cpus), '0-3 8 10-11')
+        self.assertEqual(common.parse_cpu_set('0-3 8 10-11'), cpus)
+        self.assertEqual(common.parse_cpu_set('0-3,8'), {0, 1, 2, 3, 8})
+
+    def test_server_cpu_probe_sums_process_tree(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        proc_dir = Path(temp_dir.name)
+        # pid, comm, ppid, utime, stime, cutime, cstime
+        processes = [
+            (10, 'postgres', 1, 100, 50, 20, 10),
+            (11, 'postgres', 10, 30, 20, 0, 0),
+            (12, 'post (gres)', 11, 5, 5, 0, 0),
+            (20, 'other', 1, 1000, 1000, 0, 0),
+        ]
+        for pid, comm, ppid, utime, stime, cutime, cstime in processes:
+            (proc_dir / str(pid)).mkdir(parents=True)
+            (proc_dir / str(pid) / 'comm').write_text(f'{comm}\n')
+            fields = ['S', ppid] + [0] * 9 + [utime, stime, cutime, cstime] + [0] * 5
+            (proc_dir / str(pid) / 'stat').write_text(f'{pid} ({comm}) ' + ' '.join(map(str, fields)))
+
+        with patch.object(common.ServerCPUProbe, 'proc_dir', proc_dir):
+            probe = common.ServerCPUProbe(process_name='postgres')
+            probe.clock_ticks = 100
+            self.assertEqual(probe.root_pids(), {10, 11})
+            self.assertAlmostEqual(probe.snapshot(), 2.4)
+            self.assertIsNone(common.ServerCPUProbe(process_name='mongod').snapshot())
+
+    @skipUnless(common.ResourceMonitor.available(), 'needs /proc')
+    def test_resource_monitor_measures_children(self):
+        monitor = common.ResourceMonitor(sample_interval=0.01)
+        with monitor:
+            subprocess.run([sys.executable, '-c', 'data = bytearray(64 * 2**20)'], check=True)
+        metrics = monitor.metrics('Run')
+        self.assertEqual(list(metrics), ['RunPeakRSS', 'RunReadBytes', 'RunWriteBytes'])
+        self.assertGreaterEqual(metrics['RunPeakRSS'], 64 * 2**20)
+
+    def test_semi_naive_double_recursion(self):
+        class SQLiteDoubleRecursion(common.SemiNaiveDoubleRecursion):
+            def __init__(self, conn):
+                self.conn = conn
+
+            def execute_query(self, query, params=()):
+                return self.conn.execute(query, params).rowcount
+
+            def clear_table(self, table_name):
+                self.execute_query(f'DELETE FROM {table_name};')
+
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE edge(x INTEGER NOT NULL, y INTEGER NOT NULL);')
+        conn.executemany('INSERT INTO edge VALUES (?, ?);', [(i, i + 1) for i in range(1, 16)])
+        operations = SQLiteDoubleRecursion(conn)
+        operations.run_recursive_query()
+
+        pairs = set(conn.execute('SELECT x, y FROM tc_result;'))
+        self.assertEqual(pairs, {(x, y) for x in range(1, 17) for y in range(x + 1, 17)})
+        # Path lengths double every iteration, plus the final one that finds nothing new
+        self.assertEqual(operations.counts(), {'Iterations': 5})
+
     def test_close(self):
         self.base.driver = MagicMock()
         self.base.db_path = Path('test.db')
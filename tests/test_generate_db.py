@@ -0,0 +1,101 @@
+import io
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from generate_db import DataGenerator, EdgeStore, GraphGenerator, InputManifest, encode_edges, write_edges
+from tests import BaseTest
+
+GRAPH_TYPES = [
+    'complete',
+    'cycle',
+    'cycle_with_shortcuts',
+    'star',
+    'max_acyclic',
+    'path',
+    'multi_path',
+    'binary_tree',
+    'grid',
+    'reverse_binary_tree',
+    'w',
+    'y',
+    'x',
+]
+
+
+class TestGenerateDB(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.data_gen = DataGenerator()
+
+    def test_arrays_match_generators(self):
+        for graph_type in GRAPH_TYPES:
+            for n in [2, 3, 10, 16, 50, 101]:
+                with self.subTest(graph_type=graph_type, n=n):
+                    expected = list(getattr(self.data_gen, f'generate_{graph_type}_graph')(n))
+                    edges = getattr(self.data_gen, f'generate_{graph_type}_array')(n)
+                    self.assertEqual(edges.dtype, np.int64)
+                    self.assertEqual([tuple(edge) for edge in edges.tolist()], expected)
+
+    def test_encode_edges_formats(self):
+        edges = np.array([[1, 10], [0, 7], [123, 4]], dtype=np.int64)
+        self.assertEqual(encode_edges(edges, b'', b'\t', b'\n'), b'1\t10\n0\t7\n123\t4\n')
+        self.assertEqual(
+            encode_edges(edges, b'edge(', b', ', b').\n'),
+            b'edge(1, 10).\nedge(0, 7).\nedge(123, 4).\n',
+        )
+        self.assertEqual(encode_edges(edges[:0], b'', b'\t', b'\n'), b'')
+
+    def test_write_edges_in_chunks(self):
+        edges = self.data_gen.generate_complete_array(20)
+        buffer = io.BytesIO()
+        write_edges(edges, buffer, b'', b'\t', b'\n', chunk_size=7)
+        expected = ''.join(f'{a}\t{b}\n' for a, b in self.data_gen.generate_complete_graph(20))
+        self.assertEqual(buffer.getvalue().decode(), expected)
+
+    def test_edge_store_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EdgeStore(Path(tmp))
+            edges = self.data_gen.generate_cycle_array(10)
+            store.save('cycle', 10, edges, self.data_gen.k)
+            self.assertTrue(store.exists('cycle', 10))
+            loaded = store.load('cycle', 10)
+            self.assertIsInstance(loaded, np.memmap)
+            self.assertEqual(loaded.dtype, np.int32)
+            np.testing.assert_array_equal(loaded, edges)
+            self.assertEqual(store.meta('cycle', 10)['numEdges'], len(edges))
+
+    def test_converts_only_requested_formats(self):
+        config = {'defaults': {'systems': {'dbSystems': ['postgres'], 'alda': ['alda']}}}
+        with tempfile.TemporaryDirectory() as tmp:
+            generator = GraphGenerator(Path(tmp), config)
+            generator.generate_and_save_graphs('path', 5, generator.input_formats(['postgres']))
+            facts = generator.input_path('souffle', 'path', 5)
+            self.assertEqual(facts.read_text(), '1\t2\n2\t3\n3\t4\n4\t5\n')
+            self.assertFalse(generator.input_path('clingo_xsb', 'path', 5).exists())
+            self.assertTrue(generator.edge_store.exists('path', 5))
+
+            written = generator.generate_and_save_graphs('path', 5, generator.input_formats(['xsb']))
+            self.assertEqual(list(written), ['clingo_xsb'])
+            lp = generator.input_path('clingo_xsb', 'path', 5).read_text()
+            self.assertEqual(lp.splitlines()[0], 'edge(1, 2).')
+
+    def test_manifest_generates_missing_cells_only(self):
+        config = {'defaults': {'systems': {'dbSystems': ['postgres']}}}
+        with tempfile.TemporaryDirectory() as tmp:
+            generator = GraphGenerator(Path(tmp), config)
+            generator.generate_graphs([5, 6], ['path', 'star'], ['postgres'], jobs=2)
+            self.assertEqual(generator.missing_cells([5, 6], ['path', 'star'], ['postgres']), {})
+
+            manifest = InputManifest(Path(tmp))
+            self.assertEqual(len(manifest.entries), 8)
+            self.assertTrue(manifest.is_current('path', 5, self.data_gen.k, 'souffle', verify=True))
+
+            generator.input_path('souffle', 'star', 6).unlink()
+            missing = generator.missing_cells([5, 6], ['path', 'star'], ['postgres'])
+            self.assertEqual(missing, {('star', 6): ['souffle']})
+            self.assertEqual(
+                generator.missing_cells([5, 6, 7], ['path'], ['xsb']),
+                {('path', 5): ['clingo_xsb'], ('path', 6): ['clingo_xsb'], ('path', 7): ['canonical', 'clingo_xsb']},
+            )
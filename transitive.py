@@ -3,12 +3,18 @@ import csv
 import gc
 import json
 import logging
+import os
+import queue
 import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
-from common import Base
+from common import CPU_SET_ENV, Base, format_cpu_set
+from worker import WorkerPool
 
 # TODO: Add support for specifying the base file name
 
@@ -26,6 +32,9 @@ class Experiment(Base):
         modes: list[str],
         environments: list[str],
         souffle_include_dir: str,
+        isolation: str = 'worker',
+        jobs: int = 1,
+        cpus_per_job: Optional[int] = None,
     ):
         super().__init__(config)
         self.graph_types = graph_types
@@ -34,10 +43,22 @@ class Experiment(Base):
         self.modes = modes
         self.environments = environments
         self.souffle_include_dir = souffle_include_dir
+        self.isolation = isolation
+        self.jobs = jobs
+        self.cpus_per_job = cpus_per_job
+        self.worker_pool: Optional[WorkerPool] = None
+        self.cpu_sets: queue.Queue = queue.Queue()
+        # Systems backed by a server only run one experiment at a time, so concurrent runs do not compete for it
+        server_systems = (
+            config.get('defaults', {})
+            .get('systems', {})
+            .get('serverSystems', ['postgres', 'mariadb', 'cockroachdb', 'neo4j', 'mongodb'])
+        )
+        self.server_locks = {env: threading.Lock() for env in server_systems}
         self.timing_dir = Path(config.get('timing_dir', 'timing'))
 
     def __str__(self):
-        return f'Experiment(graph_types={self.graph_types}, size_range={self.size_range}, num_runs={self.num_runs}, modes={self.modes}, environments={self.environments}, souffle_include_dir={self.souffle_include_dir})'
+        return f'Experiment(graph_types={self.graph_types}, size_range={self.size_range}, num_runs={self.num_runs}, modes={self.modes}, environments={self.environments}, souffle_include_dir={self.souffle_include_dir}, isolation={self.isolation}, jobs={self.jobs}, cpus_per_job={self.cpus_per_job})'
 
     def __delete_existing_timing_data(self):
         """
@@ -56,62 +77,35 @@ class Experiment(Base):
                         logging.info(f'Removing existing directory: {subdir}...')
                         shutil.rmtree(subdir)
 
-    def __generate_input_data(self, env_name: str, size_range: list[int], graph_types: list[str]) -> None:
+    def __generate_input_data(self, environments: list[str], size_range: list[int], graph_types: list[str]) -> None:
         """
-        Generates input data for a given environment, size range, and set of graph types.
+        Generates the input data the given environments need for a size range and set of graph types.
 
-        This function checks if the necessary data already exists in the input directory for the given environment.
-        If any data is missing, it generates the necessary data.
+        `generate_db.py` checks its input manifest and only generates the (graph type, size) cells whose files are
+        missing or stale, in parallel, so this is cheap when the data is already there.
 
         Args:
-            `env_name (str)`: The name of the environment for which to generate data.
+            `environments (list[str])`: The names of the environments for which to generate data.
             `size_range (list[int])`: A list of three integers representing the start, stop, and step of the range of sizes for which to generate data.
             `graph_types (list[str])`: A list of the types of graphs for which to generate data.
         """
-        if env_name in ['clingo', 'xsb']:
-            input_dir = Path('input') / 'clingo_xsb'
-        elif env_name in self.config['defaults']['systems']['dbSystems'] + ['souffle']:
-            input_dir = Path('input') / 'souffle'
-        else:
-            input_dir = Path('input') / env_name
-        input_dir.mkdir(parents=True, exist_ok=True)
-
-        # List to hold graph types that need data generation
-        missing_graph_types = []
-
-        # Check each graph type directory for missing sizes
-        for graph_type in graph_types:
-            graph_type_dir = input_dir / graph_type
-            if not graph_type_dir.exists():
-                # If the graph type directory doesn't exist, mark it for data generation
-                missing_graph_types.append(graph_type)
-            else:
-                # Check for missing size files in the existing graph type directory
-                existing_sizes = {int(f.stem.split('_')[-1]) for f in graph_type_dir.glob('*.*')}
-                required_sizes = set(range(size_range[0], size_range[1], size_range[2]))
-                missing_sizes = required_sizes - existing_sizes
-                if missing_sizes:
-                    missing_graph_types.append(graph_type)
-
-        # Generate data only if there are missing graph types or sizes
-        if missing_graph_types:
-            logging.info(f'Missing data for {missing_graph_types}. Generating data with size range: {size_range}...')
-            config_str = json.dumps(self.config)
-            command = [
-                'python',
-                'generate_db.py',
-                '--config',
-                config_str,
-                '--sizes',
-                str(size_range[0]),
-                str(size_range[1]),
-                str(size_range[2]),
-                '--graph-types',
-                *missing_graph_types,
-            ]
-            subprocess.run(command)
-        else:
-            logging.info(f'All data up to date for {env_name}. Skipping data generation...')
+        logging.info(f'Checking input data for {environments} with size range: {size_range}...')
+        config_str = json.dumps(self.config)
+        command = [
+            'python',
+            'generate_db.py',
+            '--config',
+            config_str,
+            '--sizes',
+            str(size_range[0]),
+            str(size_range[1]),
+            str(size_range[2]),
+            '--graph-types',
+            *graph_types,
+            '--environments',
+            *environments,
+        ]
+        subprocess.run(command)
 
     def __start_analysis(
         self,
@@ -121,11 +115,14 @@ class Experiment(Base):
         mode: str,
         env_name: str,
         souffle_include_dir: str,
+        cpus: Optional[set[int]] = None,
     ) -> None:
         """
         Starts the analysis for the given environment, size, mode, and graph type.
 
         This function runs the analysis for the given environment, size, mode, and graph type using the appropriate command.
+        With worker isolation, the logic systems and DBs are run on the warm worker pool instead of a new Python process
+        per run. Alda always runs in its own process, since it needs the DistAlgo runtime.
 
         Args:
             `graph_type (str)`: The type of graph to analyze.
@@ -134,6 +131,7 @@ class Experiment(Base):
             `mode (str)`: The mode in which to run the analysis.
             `env_name (str)`: The name of the environment in which to run the analysis.
             `souffle_include_dir (str)`: The include directory for souffle.
+            `cpus (Optional[set[int]])`: The CPU set to pin the analysis to, if any.
         """
         output_dir = self.timing_dir / env_name / graph_type
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -141,6 +139,7 @@ class Experiment(Base):
         output_path = output_dir / f'timing_{mode}_graph_{size}.csv'
 
         config_str = json.dumps(self.config)
+        descriptor = None
 
         if env_name in self.config.get('defaults', {}).get('systems', {}).get('alda', []):
             command = [
@@ -157,6 +156,8 @@ class Experiment(Base):
                 mode,
                 '--graph-type',
                 graph_type,
+                '--config',
+                config_str,
             ]
         elif env_name in self.config.get('defaults', {}).get('systems', {}).get('otherLogicSystems', []):
             logging.info(f'Analyzing {env_name} among the logic systems')
@@ -176,6 +177,7 @@ class Experiment(Base):
                 '--souffle-include-dir',
                 souffle_include_dir,
             ]
+            descriptor = {'kind': 'logic', 'souffle_include_dir': souffle_include_dir}
         elif env_name in self.config.get('defaults', {}).get('systems', {}).get('dbSystems', []):
             logging.info(f'Analyzing {env_name} among the DBs')
             command = [
@@ -192,10 +194,17 @@ class Experiment(Base):
                 '--graph-type',
                 graph_type,
             ]
+            descriptor = {'kind': 'db'}
 
-        # Run the program 10 times
-        for _ in range(self.num_runs):
-            subprocess.run(command)
+        if self.worker_pool is not None and descriptor is not None:
+            descriptor.update(environment=env_name, size=size, mode=mode, graph_type=graph_type, cpus=cpus)
+            for _ in range(self.num_runs):
+                self.worker_pool.run(descriptor)
+        else:
+            env = {**os.environ, CPU_SET_ENV: format_cpu_set(cpus)} if cpus else None
+            # Run the program 10 times
+            for _ in range(self.num_runs):
+                subprocess.run(command, env=env)
 
         # Calculate and append the average to the CSV file
         self.__calculate_and_append_average(output_path)
@@ -205,10 +214,15 @@ class Experiment(Base):
         Calculates and appends the averages of all columns to a CSV file.
 
         This function reads a CSV file, calculates the average for each column from the data in the file, and appends these averages to the end of the file. It can handle any number of columns dynamically.
+        Non-numeric columns that hold the same value on every row (e.g. the CPU set) carry that value over.
 
         Args:
             output_path (Path): The path to the CSV file.
         """
+        if not output_path.exists():
+            logging.warning(f'No timing data written to {output_path}')
+            return
+
         with open(output_path, 'r', newline='') as csvfile:
             reader = csv.reader(csvfile)
             headers = next(reader, None)  # Skip header and get header names
@@ -219,6 +233,7 @@ class Experiment(Base):
             # Initialize sum and count for each column
             sums = [0.0] * len(headers)
             counts = [0] * len(headers)
+            texts: list[set[str]] = [set() for _ in headers]
 
             for row in reader:
                 if row:  # Ensure row is not empty
@@ -228,13 +243,18 @@ class Experiment(Base):
                                 sums[i] += float(value)
                                 counts[i] += 1
                             except ValueError:
-                                logging.warning(f"Non-numeric data '{value}' in column {i} skipped")
+                                texts[i].add(value)
                         else:
                             logging.warning(f"Row has more columns than headers: {row}")
 
         # Calculate averages and prepare the row to append
         averages = []
-        for sum_value, count_value in zip(sums, counts):
+        for header, sum_value, count_value, text_values in zip(headers, sums, counts, texts):
+            if count_value == 0 and len(text_values) == 1:
+                averages.append(next(iter(text_values)))
+                continue
+            if text_values:
+                logging.warning(f"Non-numeric data {sorted(text_values)} in column {header} skipped")
             average = sum_value / count_value if count_value > 0 else 0
             averages.append(average)
 
@@ -256,8 +276,64 @@ class Experiment(Base):
 
         config_str = json.dumps(self.config)
 
+        self.__generate_input_data(self.environments, self.size_range, self.graph_types)
+
+        for cpus in self.__split_cpus():
+            self.cpu_sets.put(cpus)
+
+        if self.isolation == 'worker':
+            self.worker_pool = WorkerPool(self.config, self.jobs)
+            self.worker_pool.start()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [executor.submit(self.__run_cell, *cell) for cell in self.__pending_cells()]
+                for future in as_completed(futures):
+                    future.result()
+        finally:
+            if self.worker_pool is not None:
+                self.worker_pool.close()
+                self.worker_pool = None
+
+        # Generate latex plots and tables of the
+        subprocess.run(['python', 'generate_plot_table.py', '--config', config_str])
+
+    def __split_cpus(self) -> list[Optional[set[int]]]:
+        """
+        Splits the CPUs available to the experiment into one disjoint CPU set per concurrent job.
+
+        A single job without an explicit `cpus_per_job` is not pinned at all, as before.
+        """
+        if self.jobs == 1 and self.cpus_per_job is None:
+            return [None]
+        if not hasattr(os, 'sched_getaffinity'):
+            logging.warning('CPU pinning is not supported on this platform, running jobs unpinned')
+            return [None] * self.jobs
+
+        available = sorted(os.sched_getaffinity(0))
+        cpus_per_job = self.cpus_per_job or max(1, len(available) // self.jobs)
+        if cpus_per_job * self.jobs > len(available):
+            raise ValueError(
+                f'{self.jobs} jobs with {cpus_per_job} CPUs each need more than the {len(available)} available CPUs'
+            )
+        return [set(available[i * cpus_per_job : (i + 1) * cpus_per_job]) for i in range(self.jobs)]
+
+    def __run_cell(self, env: str, graph_type: str, size: int, mode: str) -> None:
+        """Runs the analysis of one cell on a free CPU set, one cell at a time for server-backed systems."""
+        with self.server_locks.get(env, nullcontext()):
+            cpus = self.cpu_sets.get()
+            try:
+                logging.info(
+                    f'Running {env} {graph_type} {mode} size {size} on CPUs {format_cpu_set(cpus) if cpus else "all"}'
+                )
+                self.__start_analysis(graph_type, size, self.size_range[-1], mode, env, self.souffle_include_dir, cpus)
+            finally:
+                self.cpu_sets.put(cpus)
+
+    def __pending_cells(self) -> list[tuple[str, str, int, str]]:
+        """Lists the (environment, graph type, size, mode) cells that have no timing data yet."""
+        cells = []
         for env in self.environments:
-            self.__generate_input_data(env, self.size_range, self.graph_types)
             for graph_type in self.graph_types:
                 for size in range(*self.size_range):
                     # Check if experiment data already exists for this size and skip if it does
@@ -273,17 +349,8 @@ class Experiment(Base):
 
                     # If no existing data, run the experiment
                     for mode in self.modes:
-                        self.__start_analysis(
-                            graph_type,
-                            size,
-                            self.size_range[-1],
-                            mode,
-                            env,
-                            self.souffle_include_dir,
-                        )
-
-        # Generate latex plots and tables of the
-        subprocess.run(['python', 'generate_plot_table.py', '--config', config_str])
+                        cells.append((env, graph_type, size, mode))
+        return cells
 
 
 def load_config(file_path: str) -> dict[str, Any]:
@@ -359,8 +426,29 @@ def main() -> None:
         default='$HOME/systems/souffle/include',
         help='The include directory for souffle. Default is $HOME/systems/souffle/include.',
     )
+    parser.add_argument(
+        '--isolation',
+        type=str,
+        default='worker',
+        choices=['worker', 'process'],
+        help='How runs are isolated: "worker" reuses warm analysis workers, "process" starts a new Python process per run to measure cold starts. Default is worker.',
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of experiment cells (environment, graph type, size, mode) to run concurrently on disjoint CPU sets. Server-backed systems still run one cell at a time. Default is 1.',
+    )
+    parser.add_argument(
+        '--cpus-per-job',
+        type=int,
+        help='Number of CPUs each concurrent job is pinned to. Default is the available CPUs divided by --jobs.',
+    )
     args = parser.parse_args()
 
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
     config = load_config(args.config_file)
 
     environments = set(args.environments)
@@ -385,6 +473,9 @@ def main() -> None:
         args.modes,
         args.environments,
         args.souffle_include_dir,
+        args.isolation,
+        args.jobs,
+        args.cpus_per_job,
     )
 
     logging.info(f'Starting experiment: {experiment}')
@@ -0,0 +1,139 @@
+import gc
+import importlib
+import logging
+import multiprocessing
+import queue
+from multiprocessing.connection import Connection
+from typing import Any, Optional
+
+from common import pin_to_cpu_set, preload_drivers
+
+# Set up logging with a specific format and include the file name and line number
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+
+# Module that implements the run for each kind of system, imported once per worker
+RUNNER_MODULES = {
+    'logic': 'analyze_logic_systems',
+    'db': 'analyze_dbs',
+}
+
+
+def serve(conn: Connection, config: dict[str, Any]) -> None:
+    """
+    Worker loop: imports the analysis modules once and then executes run descriptors received over the pipe.
+
+    The DB drivers of the configured systems are imported up front as well, so no run pays for them.
+    Each descriptor is a dictionary holding the `kind` of system (see `RUNNER_MODULES`) and the keyword arguments of
+    the module's `run_experiment` function, except for the config which is given once when the worker starts. An
+    optional `cpus` entry pins the worker to that CPU set before the run. A reply with the status of the run is sent
+    back for every descriptor. `None` stops the worker.
+
+    Args:
+        `conn (Connection)`: The worker end of the pipe.
+        `config (dict[str, Any])`: The configuration shared by all runs of this worker.
+    """
+    runners = {kind: importlib.import_module(module).run_experiment for kind, module in RUNNER_MODULES.items()}
+    preload_drivers(config.get('defaults', {}).get('systems', {}).get('dbSystems', []))
+    gc.disable()
+
+    while True:
+        try:
+            descriptor = conn.recv()
+        except EOFError:
+            break
+        if descriptor is None:
+            break
+
+        descriptor = dict(descriptor)
+        kind = descriptor.pop('kind')
+        cpus = descriptor.pop('cpus', None)
+        try:
+            if cpus is not None:
+                pin_to_cpu_set(cpus)
+            runners[kind](config, **descriptor)
+            conn.send({'status': 'ok'})
+        except Exception as e:
+            logging.error(f'Worker run failed for {kind} {descriptor}: {e}')
+            conn.send({'status': 'error', 'error': str(e)})
+        finally:
+            # Collect between runs so that garbage of one run does not count towards the next one
+            gc.collect()
+
+    conn.close()
+
+
+class WorkerPool:
+    """
+    A pool of long-lived worker processes that run experiments without paying the interpreter and import start-up
+    cost for every run.
+
+    Idle workers are kept in a thread-safe queue, so the pool can be shared by several scheduler threads. A worker
+    that dies during a run (e.g. a crash inside a native driver) is replaced by a fresh one.
+    """
+
+    def __init__(self, config: dict[str, Any], size: int = 1):
+        self.config = config
+        self.size = size
+        self.workers: list[tuple[multiprocessing.Process, Connection]] = []
+        self.idle: queue.Queue = queue.Queue()
+
+    def __enter__(self) -> 'WorkerPool':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __spawn(self) -> tuple[multiprocessing.Process, Connection]:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=serve, args=(child_conn, self.config), daemon=True)
+        process.start()
+        child_conn.close()
+        worker = (process, parent_conn)
+        self.workers.append(worker)
+        return worker
+
+    def start(self) -> None:
+        """Starts the worker processes of the pool."""
+        for _ in range(self.size):
+            self.idle.put(self.__spawn())
+        logging.info(f'Started {self.size} analysis worker(s)')
+
+    def run(self, descriptor: dict[str, Any]) -> bool:
+        """
+        Runs a descriptor on the next idle worker, waiting for one to become available.
+
+        Args:
+            `descriptor (dict[str, Any])`: The run descriptor, see `serve`.
+
+        Returns:
+            `bool`: True if the run completed successfully, False otherwise.
+        """
+        worker = self.idle.get()
+        process, conn = worker
+        reply: Optional[dict[str, Any]] = None
+        try:
+            conn.send(descriptor)
+            reply = conn.recv()
+        except (EOFError, OSError) as e:
+            logging.error(f'Worker {process.pid} died while running {descriptor}: {e}')
+            process.join()
+            conn.close()
+            self.workers.remove(worker)
+            worker = self.__spawn()
+        finally:
+            self.idle.put(worker)
+
+        return reply is not None and reply.get('status') == 'ok'
+
+    def close(self) -> None:
+        """Stops all the workers of the pool."""
+        for process, conn in self.workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process, conn in self.workers:
+            process.join()
+            conn.close()
+        self.workers.clear()